@@ -0,0 +1,344 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import numpy as np
+import pandas as pd
+import httpx
+from colorama import Fore, Style, init
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from backend.benchmarks import synth_leads
+
+init(autoreset=True)
+
+# Load test of the FastAPI service end to end, without a GPU or a live model.
+# Starts the Ollama stub (ollama_stub.py) and the API (uvicorn backend.main:app) as subprocesses against
+# a synthetic lead file (synth_leads.py), then drives each scenario with a fixed number of requests at a
+# fixed concurrency. Reports throughput, p50/p95/p99 latency and the server's peak RSS per scenario, and
+# saves everything as JSON; --baseline compares against a previous run and exits 1 on a regression.
+#
+#   python backend/benchmarks/bench_api.py --rows 1000000 --scenarios leads,generate_email
+#   python backend/benchmarks/bench_api.py --baseline backend/artifacts/benchmarks/<earlier run>.json
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+BENCH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'artifacts', 'benchmarks'))
+
+SCENARIOS = ('leads', 'leads_top', 'generate_email', 'train')
+# Requests per scenario before measuring (model/page caches, connection pools)
+WARMUP_REQUESTS = 5
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _wait_ready(url, proc, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode} before becoming ready")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise TimeoutError(f"{url} was not ready after {timeout}s")
+
+def _proc_memory_mb(pid, field):
+    # Linux only (VmRSS = current, VmHWM = peak); None elsewhere
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+class RssSampler(threading.Thread):
+    """Polls a process's resident set size and keeps the peak since the last reset()."""
+
+    def __init__(self, pid, interval=0.02):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.is_set():
+            rss = _proc_memory_mb(self.pid, 'VmRSS')
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            self._halt.wait(self.interval)
+
+    def reset(self):
+        self.peak = _proc_memory_mb(self.pid, 'VmRSS')
+
+    def stop(self):
+        self._halt.set()
+
+async def _drive(client, make_request, n_requests, concurrency):
+    """Runs n_requests calls of make_request(client, i) with `concurrency` in flight."""
+    latencies = np.full(n_requests, np.nan)
+    errors = []
+    next_index = iter(range(n_requests))
+
+    async def worker():
+        for i in next_index:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client, i)
+                if response.status_code >= 400:
+                    errors.append(f"HTTP {response.status_code}: {response.text[:200]}")
+                    continue
+            except httpx.HTTPError as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies[~np.isnan(latencies)], errors, time.perf_counter() - start
+
+def _summary(latencies, errors, elapsed, concurrency, peak_rss):
+    ms = latencies * 1000
+    return {
+        "requests": int(len(latencies) + len(errors)),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else None,
+        "latency_ms": {
+            "mean": float(ms.mean()) if len(ms) else None,
+            "p50": float(np.percentile(ms, 50)) if len(ms) else None,
+            "p95": float(np.percentile(ms, 95)) if len(ms) else None,
+            "p99": float(np.percentile(ms, 99)) if len(ms) else None,
+            "max": float(ms.max()) if len(ms) else None
+        },
+        "peak_rss_mb": peak_rss
+    }
+
+def _lead_profiles(data_path, n, seed=0):
+    # Request bodies for /api/generate-email from real rows of the benchmark file
+    df = pd.read_csv(data_path, nrows=max(n, 1) * 20).sample(frac=1, random_state=seed).head(n)
+    df = df.fillna('')
+    return [{
+        "LeadId": str(row.get('Prospect ID', i)),
+        "LeadOrigin": str(row.get('Lead Origin', '')),
+        "LeadSource": str(row.get('Lead Source', '')),
+        "TotalTimeSpentOnWebsite": float(row.get('Total Time Spent on Website') or 0),
+        "LastActivity": str(row.get('Last Activity', '')),
+        "Tags": str(row.get('Tags', '')),
+        "ConvertedProbability": 0.5,
+        "City": str(row.get('City', '')) or None
+    } for i, row in enumerate(df.to_dict(orient='records'))]
+
+def _scenario_plan(name, args, profiles):
+    """(make_request, requests, concurrency, warmup) for a scenario."""
+    if name == 'leads':
+        return (lambda c, i: c.get('/api/leads', params={"limit": args.leads_limit}),
+                args.requests, args.concurrency, WARMUP_REQUESTS)
+    if name == 'leads_top':
+        return (lambda c, i: c.get('/api/leads/top', params={"k": 50, "offset": (i * 50) % 5000}),
+                args.requests, args.concurrency, WARMUP_REQUESTS)
+    if name == 'generate_email':
+        return (lambda c, i: c.post('/api/generate-email', json={
+                    "lead_profile": profiles[i % len(profiles)], "use_cache": args.email_cache}),
+                args.email_requests, args.email_concurrency, 1)
+    if name == 'train':
+        # Sequential: concurrent synchronous retrains only queue behind each other
+        return (lambda c, i: c.post('/api/train', json={}), args.train_runs, 1, 0)
+    raise ValueError(f"Unknown scenario {name!r}; expected one of {SCENARIOS}")
+
+async def _run_scenarios(base_url, scenarios, args, profiles, sampler):
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout,
+                                 limits=httpx.Limits(max_connections=max(args.concurrency, args.email_concurrency))) as client:
+        for name in scenarios:
+            make_request, n_requests, concurrency, warmup = _scenario_plan(name, args, profiles)
+            if warmup:
+                await _drive(client, make_request, warmup, min(warmup, concurrency))
+            sampler.reset()
+            latencies, errors, elapsed = await _drive(client, make_request, n_requests, concurrency)
+            results[name] = _summary(latencies, errors, elapsed, concurrency, sampler.peak)
+            print_scenario(name, results[name])
+    return results
+
+def print_scenario(name, result):
+    lat = result["latency_ms"]
+    fmt = lambda v: f"{v:9.1f}" if v is not None else "      n/a"
+    color = Fore.RED if result["errors"] else Fore.GREEN
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/a"
+    print(f"  {name:<15} {color}{result['requests'] - result['errors']:>5}/{result['requests']:<5}{Style.RESET_ALL} "
+          f"{(result['throughput_rps'] or 0):8.2f} req/s  p50 {fmt(lat['p50'])}  p95 {fmt(lat['p95'])}  "
+          f"p99 {fmt(lat['p99'])} ms  peak RSS {rss}")
+    if result["first_error"]:
+        print(f"    {Fore.RED}first error: {result['first_error']}{Style.RESET_ALL}")
+
+def compare(current, baseline, tolerance):
+    """Regressions of current vs baseline: throughput down, or p99 / peak RSS up, by more than `tolerance`."""
+    regressions = []
+    print(f"\n{Fore.YELLOW}=== vs baseline {baseline.get('run_id')} (tolerance {tolerance:.0%}) ==={Style.RESET_ALL}")
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        checks = [
+            ("throughput", result["throughput_rps"], base["throughput_rps"], -1),
+            ("p99", result["latency_ms"]["p99"], base["latency_ms"]["p99"], 1),
+            ("peak RSS", result["peak_rss_mb"], base["peak_rss_mb"], 1)
+        ]
+        parts = []
+        for label, value, reference, worse_sign in checks:
+            if value is None or not reference:
+                continue
+            change = (value - reference) / reference
+            regressed = change * worse_sign > tolerance
+            if regressed:
+                regressions.append(f"{name} {label} {change:+.0%}")
+            parts.append(f"{Fore.RED if regressed else ''}{label} {change:+.1%}{Style.RESET_ALL}")
+        print(f"  {name:<15} " + "  ".join(parts))
+    return regressions
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _dataset(args):
+    if args.data:
+        return os.path.abspath(args.data), None
+    path = os.path.join(BENCH_DIR, 'data', f"leads_{args.rows}_seed{args.seed}.csv")
+    if os.path.exists(path):
+        return path, None
+    print(f"Generating {args.rows:,} synthetic leads -> {path}")
+    start = time.perf_counter()
+    synth_leads.write_csv(path, args.rows, seed=args.seed)
+    return path, time.perf_counter() - start
+
+def run(args):
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    for name in scenarios:
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; expected one of {SCENARIOS}")
+    data_path, generate_seconds = _dataset(args)
+    run_id = time.strftime('%Y%m%d-%H%M%S')
+
+    print(f"{Fore.CYAN}=== API benchmark {run_id}: {', '.join(scenarios)} on {os.path.basename(data_path)} ==={Style.RESET_ALL}")
+    with tempfile.TemporaryDirectory(prefix='bench_api_') as workdir:
+        stub_port, api_port = _free_port(), _free_port()
+        stub = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(__file__), 'ollama_stub.py'), '--port', str(stub_port),
+             '--latency', str(args.llm_latency), '--token-rate', str(args.token_rate),
+             '--output-tokens', str(args.output_tokens), '--parallel', str(args.llm_parallel)],
+            stdout=subprocess.DEVNULL
+        )
+        # Isolated state: a fresh model store and caches, so every run trains and scores the same way
+        env = dict(os.environ,
+                   OLLAMA_HOST=f"127.0.0.1:{stub_port}",
+                   LEAD_DATA_PATH=data_path,
+                   MODEL_STORE_DIR=os.path.join(workdir, 'models'),
+                   DATASET_CACHE_DIR=os.path.join(workdir, 'cache'),
+                   EMAIL_CACHE_DB='',
+                   USAGE_DB=os.path.join(workdir, 'usage.sqlite3'),
+                   PYTHONPATH=REPO_ROOT)
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'backend.main:app', '--host', '127.0.0.1', '--port', str(api_port),
+             '--log-level', 'warning'],
+            cwd=REPO_ROOT, env=env, stdout=None if args.verbose else subprocess.DEVNULL,
+            stderr=None if args.verbose else subprocess.DEVNULL
+        )
+        sampler = RssSampler(server.pid)
+        try:
+            _wait_ready(f"http://127.0.0.1:{stub_port}/", stub, 30)
+            sampler.start()
+            start = time.perf_counter()
+            # Startup includes the initial training and score index (empty model store)
+            _wait_ready(f"http://127.0.0.1:{api_port}/api/model", server, args.startup_timeout)
+            startup = {"seconds": time.perf_counter() - start, "rss_mb": _proc_memory_mb(server.pid, 'VmRSS')}
+            print(f"  {'startup':<15} ready in {startup['seconds']:.1f}s"
+                  + (f", RSS {startup['rss_mb']:.0f} MB" if startup['rss_mb'] is not None else ""))
+
+            profiles = _lead_profiles(data_path, max(args.email_requests, 1), seed=args.seed)
+            results = asyncio.run(_run_scenarios(f"http://127.0.0.1:{api_port}", scenarios, args, profiles, sampler))
+            server_peak = _proc_memory_mb(server.pid, 'VmHWM')
+        finally:
+            sampler.stop()
+            for proc in (server, stub):
+                proc.terminate()
+                try:
+                    proc.wait(timeout=20)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+    report = {
+        "run_id": run_id,
+        "git_commit": _git_commit(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpu_count": os.cpu_count()},
+        "config": vars(args),
+        "dataset": {"path": data_path, "rows": int(sum(1 for _ in open(data_path, 'rb')) - 1),
+                    "generate_seconds": generate_seconds},
+        "startup": startup,
+        "server_peak_rss_mb": server_peak,
+        "scenarios": results
+    }
+    output = args.output or os.path.join(BENCH_DIR, f"bench_api_{run_id}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {output}")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput / latency / memory benchmark of the API with an LLM stub")
+    parser.add_argument('--scenarios', default='leads,leads_top,generate_email,train',
+                        help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument('--rows', type=int, default=100_000, help="Synthetic leads to generate (cached per size)")
+    parser.add_argument('--data', default=None, help="Use this lead CSV instead of generating one")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=200, help="Requests per leads scenario")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrency of the leads scenarios")
+    parser.add_argument('--leads-limit', type=int, default=1000, help="limit= for /api/leads")
+    parser.add_argument('--email-requests', type=int, default=40)
+    parser.add_argument('--email-concurrency', type=int, default=8)
+    parser.add_argument('--email-cache', action='store_true', help="Allow cached drafts (default: every call generates)")
+    parser.add_argument('--train-runs', type=int, default=2)
+    parser.add_argument('--token-rate', type=float, default=40.0, help="Stub output tokens per second")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="Stub seconds before the first token")
+    parser.add_argument('--output-tokens', type=int, default=120, help="Stub tokens per email")
+    parser.add_argument('--llm-parallel', type=int, default=4, help="Stub concurrent generations")
+    parser.add_argument('--request-timeout', type=float, default=600.0)
+    parser.add_argument('--startup-timeout', type=float, default=900.0)
+    parser.add_argument('--output', default=None, help="JSON path (default: backend/artifacts/benchmarks/)")
+    parser.add_argument('--baseline', default=None, help="Previous run JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Relative change counted as a regression")
+    parser.add_argument('--verbose', action='store_true', help="Show the server's own output")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{Fore.RED}Regressions: {', '.join(regressions)}{Style.RESET_ALL}")
+            sys.exit(1)
+        print(f"{Fore.GREEN}No regressions{Style.RESET_ALL}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import tracemalloc
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.pipeline import Pipeline
+from lightgbm import LGBMClassifier
+from colorama import Fore, Style, init
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from backend.features import engineer_features, ACTIVITY_SCORES
+from backend.ml_service import (build_preprocessor, categorical_fit_params, transformed_feature_names,
+                                PREPROCESSING_MODES, MODEL_INPUT_COLUMNS, ENGINEERED_FEATURES)
+from backend.gains import capture_rates
+
+init(autoreset=True)
+
+# One-hot vs native categorical preprocessing: fit time, predict latency and memory.
+# Each case runs in a fresh process so peak RSS is not polluted by the previous case.
+
+ROW_COUNTS = [100_000, 1_000_000]
+# CRM exports: Tags and Lead Source are high-cardinality free-text-ish fields
+N_TAGS = 2_000
+N_SOURCES = 300
+BATCH_ROWS = 10_000
+
+def make_frame(n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    tags = np.array([f"tag_{i}" for i in range(N_TAGS)], dtype=object)
+    sources = np.array([f"source_{i}" for i in range(N_SOURCES)], dtype=object)
+    activities = np.array(list(ACTIVITY_SCORES) + ['Unsubscribed'], dtype=object)
+    # Zipf-like popularity, so a few values dominate as in real exports
+    tag_idx = np.minimum(rng.zipf(1.3, n_rows) - 1, N_TAGS - 1)
+    source_idx = np.minimum(rng.zipf(1.5, n_rows) - 1, N_SOURCES - 1)
+    df = pd.DataFrame({
+        'Lead Origin': rng.choice(np.array(['API', 'Landing Page Submission', 'Lead Add Form'], dtype=object), n_rows),
+        'Lead Source': sources[source_idx],
+        'Total Time Spent on Website': rng.integers(0, 2000, n_rows),
+        'Last Activity': rng.choice(activities, n_rows),
+        'Tags': tags[tag_idx],
+    })
+    # Label driven by tag and time on site, so the models have something to learn
+    tag_effect = rng.normal(0, 1, N_TAGS)[tag_idx]
+    logit = tag_effect + (df['Total Time Spent on Website'].to_numpy() - 1000) / 600
+    df['Converted'] = (rng.random(n_rows) < 1 / (1 + np.exp(-logit))).astype(int)
+    return df
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError: # Windows
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_case(mode, n_rows):
+    df = engineer_features(make_frame(n_rows))
+    features = MODEL_INPUT_COLUMNS + ENGINEERED_FEATURES
+    split = int(n_rows * 0.8)
+    X_train, y_train = df[features].iloc[:split], df['Converted'].iloc[:split]
+    X_test, y_test = df[features].iloc[split:], df['Converted'].iloc[split:]
+    rss_before = _peak_rss_mb()
+
+    clf = Pipeline(steps=[('preprocessor', build_preprocessor(mode)),
+                          ('classifier', LGBMClassifier(random_state=42, verbose=-1))])
+    tracemalloc.start()
+    start = time.perf_counter()
+    clf.fit(X_train, y_train, **categorical_fit_params(mode, step='classifier'))
+    fit_seconds = time.perf_counter() - start
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    batch = X_test.iloc[:BATCH_ROWS]
+    start = time.perf_counter()
+    clf.predict_proba(batch)
+    batch_seconds = time.perf_counter() - start
+
+    one = X_test.iloc[:1]
+    single = []
+    for _ in range(200):
+        start = time.perf_counter()
+        clf.predict_proba(one)
+        single.append(time.perf_counter() - start)
+
+    transformed = clf.named_steps['preprocessor'].transform(batch)
+    importances = clf.named_steps['classifier'].feature_importances_
+    names = transformed_feature_names(clf.named_steps['preprocessor'], mode)
+    top_feature = names[int(np.argmax(importances))]
+
+    return {
+        "Mode": mode,
+        "Rows": n_rows,
+        "Columns": transformed.shape[1],
+        "Fit (s)": fit_seconds,
+        f"Predict {BATCH_ROWS // 1000}k (ms)": batch_seconds * 1000,
+        "Predict 1 row p50 (ms)": float(np.median(single)) * 1000,
+        "Fit alloc peak (MB)": traced_peak / (1024 * 1024),
+        "Peak RSS (MB)": _peak_rss_mb(),
+        "RSS growth (MB)": _peak_rss_mb() - rss_before,
+        "Top 10% Capture": float(capture_rates(y_test, clf.predict_proba(X_test)[:, 1], (10,))[0]),
+        "Top feature": top_feature
+    }
+
+def main():
+    print(f"{Fore.CYAN}=== One-hot vs native categorical preprocessing ==={Style.RESET_ALL}")
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for n_rows in ROW_COUNTS:
+        for mode in PREPROCESSING_MODES:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results.append(pool.submit(run_case, mode, n_rows).result())
+            print(f"  {mode:>7} @ {n_rows:>9,} rows done")
+
+    results_df = pd.DataFrame(results)
+    print(f"\n{Fore.YELLOW}=== Results ==={Style.RESET_ALL}")
+    print(results_df.to_string(index=False, float_format="%.3f"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from colorama import Fore, Style, init
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from backend import ml_service, model_store
+from backend.features import engineer_record
+from backend.lean_scorer import LeanScorer, SCORER_FILENAME
+
+init(autoreset=True)
+
+# Per-lead latency of single-lead scoring: the pandas/sklearn pipeline path vs the compiled LeanScorer.
+# Uses the latest persisted model (trains one if the store is empty) and real leads from the dataset.
+
+def pipeline_proba(model, lead):
+    # The pre-compiled predict_lead_proba path
+    df = pd.DataFrame([engineer_record(lead)])
+    return model.predict_proba(df)[0][1]
+
+def measure(fn, leads, warmup=50):
+    for lead in leads[:warmup]:
+        fn(lead)
+    timings = np.empty(len(leads))
+    for i, lead in enumerate(leads):
+        start = time.perf_counter()
+        fn(lead)
+        timings[i] = time.perf_counter() - start
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-lead scoring latency")
+    parser.add_argument('--leads', type=int, default=2000, help="Number of leads to score per path")
+    parser.add_argument('--preprocessing', choices=ml_service.PREPROCESSING_MODES, default=None,
+                        help="Train a fresh model in this mode instead of using the latest one")
+    args = parser.parse_args()
+
+    if args.preprocessing:
+        ml_service.train_model(preprocessing=args.preprocessing)
+    else:
+        ml_service.ensure_model_loaded()
+    model, metadata = ml_service.current_model, ml_service.current_model_metadata
+    # Load the exported artifact the way an external worker would (numpy + lightgbm only)
+    exported = model_store.artifact_path(metadata['version'], SCORER_FILENAME)
+    scorer = LeanScorer.load(exported) if os.path.exists(exported) else LeanScorer.compile(model, metadata.get('preprocessing', 'onehot'))
+
+    df = ml_service.load_data()
+    leads = df.sample(min(args.leads, len(df)), random_state=42)[ml_service.MODEL_INPUT_COLUMNS].to_dict(orient='records')
+
+    print(f"{Fore.CYAN}=== Single-lead scoring latency ({len(leads)} leads, model {metadata['version']}, "
+          f"{metadata.get('preprocessing', 'onehot')}) ==={Style.RESET_ALL}")
+    results = []
+    for name, fn in [('pipeline (pandas + sklearn)', lambda lead: pipeline_proba(model, lead)),
+                     ('lean scorer', scorer.predict_proba)]:
+        timings = measure(fn, leads) * 1e6
+        results.append({
+            "Path": name,
+            "p50 (us)": np.percentile(timings, 50),
+            "p95 (us)": np.percentile(timings, 95),
+            "p99 (us)": np.percentile(timings, 99),
+            "max (us)": timings.max(),
+            "leads/s": 1e6 / timings.mean()
+        })
+
+    diff = max(abs(pipeline_proba(model, lead) - scorer.predict_proba(lead)) for lead in leads)
+    results_df = pd.DataFrame(results)
+    print(results_df.to_string(index=False, float_format="%.1f"))
+    print(f"\nSpeedup at p99: {results[0]['p99 (us)'] / results[1]['p99 (us)']:.1f}x")
+    print(f"Max |probability difference|: {diff:.2e}")
+
+if __name__ == "__main__":
+    main()
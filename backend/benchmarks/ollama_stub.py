@@ -0,0 +1,169 @@
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Deterministic stand-in for the Ollama HTTP API, so the service can be load-tested without a GPU.
+# Implements what ChatOllama uses (POST /api/chat, streamed or not, plain or format=json) plus the
+# health endpoints. Replies are a pure function of the prompt and --seed; timing is simulated:
+#   time to first token = --latency + prompt tokens / --prompt-rate, then --token-rate tokens per second.
+# --parallel mimics OLLAMA_NUM_PARALLEL: further requests queue for a slot, as on a real GPU.
+# The final chunk carries prompt_eval_count / eval_count / *_duration like Ollama's, so token
+# accounting (backend/usage.py) sees realistic metadata.
+#
+#   python backend/benchmarks/ollama_stub.py --port 11435 --token-rate 40 --latency 0.2
+#   OLLAMA_HOST=127.0.0.1:11435 uvicorn backend.main:app
+
+WORDS = ("storage", "capacity", "performance", "reliable", "drive", "data", "team", "workflow", "solution",
+         "enterprise", "secure", "scale", "faster", "cost", "value", "archive", "cloud", "NVMe", "helium", "build")
+
+# Ollama-style token estimate for the prompt (roughly 4 characters per token)
+CHARS_PER_TOKEN = 4
+
+class StubConfig:
+    def __init__(self, latency=0.2, token_rate=40.0, prompt_rate=2000.0, output_tokens=120, parallel=4, seed=0):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.prompt_rate = prompt_rate
+        self.output_tokens = output_tokens
+        self.seed = seed
+        self.slots = threading.Semaphore(parallel)
+
+def _prompt_text(body):
+    return "\n".join(str(m.get('content', '')) for m in body.get('messages', []))
+
+def _rng(config, prompt):
+    digest = hashlib.sha256(f"{config.seed}:{prompt}".encode('utf-8')).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+def reply_tokens(config, prompt, json_mode):
+    """The reply as a list of token strings (deterministic for a given prompt and seed)."""
+    rng = _rng(config, prompt)
+    if json_mode or '"score"' in prompt:
+        # Jury prompts: batched panels list "- id: <reviewer>", single jurists expect one verdict
+        ids = re.findall(r"- id: (\S+)", prompt)
+        verdict = lambda: {"score": rng.randint(5, 9), "reasoning": "Clear value and call to action."}
+        payload = {i: verdict() for i in ids} if ids else verdict()
+        text = json.dumps(payload)
+        # Streamed in ~4-character pieces like a tokenizer would
+        return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+    n = config.output_tokens
+    return [("" if i == 0 else " ") + rng.choice(WORDS) for i in range(n - 1)] + ["."]
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.startswith('/api/tags'):
+            self._send_json({"models": [{"name": "mistral:latest", "model": "mistral:latest"}]})
+        elif self.path.startswith('/api/version'):
+            self._send_json({"version": "0.0.0-stub"})
+        else:
+            data = b"Ollama is running"
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    def do_POST(self):
+        if not self.path.startswith('/api/chat'):
+            self._send_json({"error": f"{self.path} is not implemented by the stub"}, status=404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        config = self.config
+        prompt = _prompt_text(body)
+        tokens = reply_tokens(config, prompt, body.get('format') == 'json')
+        prompt_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+        model = body.get('model', 'mistral')
+
+        def chunk(content, done=False, **extra):
+            return {"model": model, "created_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                    "message": {"role": "assistant", "content": content}, "done": done, **extra}
+
+        with config.slots:
+            start = time.perf_counter()
+            prompt_seconds = config.latency + prompt_tokens / config.prompt_rate
+            time.sleep(prompt_seconds)
+            step = 1.0 / config.token_rate if config.token_rate > 0 else 0.0
+
+            def final():
+                total = time.perf_counter() - start
+                return chunk("", done=True, done_reason="stop", prompt_eval_count=prompt_tokens,
+                             eval_count=len(tokens), total_duration=int(total * 1e9), load_duration=0,
+                             prompt_eval_duration=int(prompt_seconds * 1e9),
+                             eval_duration=int(max(0.0, total - prompt_seconds) * 1e9))
+
+            if body.get('stream', True):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                # Paced against the start of generation, so sleep overshoot does not accumulate
+                generation_start = time.perf_counter()
+                for i, token in enumerate(tokens):
+                    delay = generation_start + i * step - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self._write_chunk(chunk(token))
+                self._write_chunk(final())
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            else:
+                time.sleep(step * len(tokens))
+                payload = final()
+                payload["message"]["content"] = "".join(tokens)
+                self._send_json(payload)
+
+    def _write_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode('utf-8')
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+def make_server(host='127.0.0.1', port=11435, **config):
+    handler = type('ConfiguredStubHandler', (StubHandler,), {"config": StubConfig(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic Ollama API stand-in for benchmarks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--latency', type=float, default=0.2, help="Fixed seconds before the first token")
+    parser.add_argument('--token-rate', type=float, default=40.0, help="Output tokens per second per request")
+    parser.add_argument('--prompt-rate', type=float, default=2000.0, help="Prompt tokens processed per second")
+    parser.add_argument('--output-tokens', type=int, default=120, help="Tokens per generated email")
+    parser.add_argument('--parallel', type=int, default=4, help="Concurrent generations (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, latency=args.latency, token_rate=args.token_rate,
+                         prompt_rate=args.prompt_rate, output_tokens=args.output_tokens,
+                         parallel=args.parallel, seed=args.seed)
+    print(f"Ollama stub on http://{args.host}:{args.port} ({args.token_rate:g} tok/s, {args.latency:g}s latency, "
+          f"{args.parallel} parallel)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
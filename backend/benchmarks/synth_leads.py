@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from colorama import Fore, Style, init
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from backend.dataset import DATA_PATH
+from backend.features import HIGH_INTENT_TAGS, ACTIVITY_SCORES
+
+init(autoreset=True)
+
+# Synthetic leads shaped like Lead Scoring.csv, at any scale, for load tests and benchmarks.
+# With the real export available, rows are bootstrapped from it (same columns, value mix and label
+# correlations) with numeric jitter and fresh Prospect IDs / Lead Numbers. Without it, a built-in
+# generator produces the columns the service reads. Rows are written in chunks, so millions of rows
+# never need to sit in memory at once. Output is deterministic for a given --seed.
+
+CHUNK_ROWS = 250_000
+# Numeric columns jittered by up to +/- this fraction; everything else is copied as sampled
+JITTER_COLUMNS = {'TotalVisits': 0.2, 'Total Time Spent on Website': 0.15, 'Page Views Per Visit': 0.2}
+FIRST_LEAD_NUMBER = 700_000
+
+def _bootstrap_chunk(source, start, n_rows, rng):
+    df = source.iloc[rng.integers(0, len(source), n_rows)].reset_index(drop=True)
+    for col, spread in JITTER_COLUMNS.items():
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce')
+            jittered = (values * rng.uniform(1 - spread, 1 + spread, n_rows)).clip(lower=0)
+            # Counts stay integers (nullable, as the export has gaps); the per-visit ratio keeps 2 decimals
+            df[col] = jittered.round(2) if col == 'Page Views Per Visit' else jittered.round().astype('Int64')
+    if 'Prospect ID' in df.columns:
+        df['Prospect ID'] = [f"synth-{start + i:09d}" for i in range(n_rows)]
+    if 'Lead Number' in df.columns:
+        df['Lead Number'] = np.arange(FIRST_LEAD_NUMBER + start, FIRST_LEAD_NUMBER + start + n_rows)
+    return df
+
+def _builtin_chunk(start, n_rows, rng):
+    tags = np.array(HIGH_INTENT_TAGS + ['Ringing', 'Already a student', 'invalid number', 'switched off', None],
+                    dtype=object)
+    activities = np.array(list(ACTIVITY_SCORES) + ['Unsubscribed', None], dtype=object)
+    df = pd.DataFrame({
+        'Prospect ID': [f"synth-{start + i:09d}" for i in range(n_rows)],
+        'Lead Number': np.arange(FIRST_LEAD_NUMBER + start, FIRST_LEAD_NUMBER + start + n_rows),
+        'Lead Origin': rng.choice(np.array(['API', 'Landing Page Submission', 'Lead Add Form', 'Lead Import'],
+                                           dtype=object), n_rows, p=[0.4, 0.5, 0.08, 0.02]),
+        'Lead Source': rng.choice(np.array(['Google', 'Direct Traffic', 'Olark Chat', 'Organic Search',
+                                            'Reference', None], dtype=object), n_rows),
+        'TotalVisits': rng.poisson(3.5, n_rows),
+        'Total Time Spent on Website': rng.gamma(1.2, 400, n_rows).round().astype(int),
+        'Last Activity': rng.choice(activities, n_rows),
+        'Specialization': rng.choice(np.array(['Select', 'Finance Management', 'Marketing Management',
+                                               'IT Projects Management', None], dtype=object), n_rows),
+        'Tags': rng.choice(tags, n_rows),
+        'City': rng.choice(np.array(['Mumbai', 'Thane & Outskirts', 'Other Cities', None], dtype=object), n_rows),
+    })
+    # Conversion driven by intent tags, activity and time on site, so models have signal to learn
+    logit = (-1.2 + 2.0 * df['Tags'].isin(HIGH_INTENT_TAGS)
+             + df['Last Activity'].map(ACTIVITY_SCORES).fillna(0) / 8
+             + (df['Total Time Spent on Website'] - 500) / 700)
+    df.insert(4, 'Converted', (rng.random(n_rows) < 1 / (1 + np.exp(-logit))).astype(int))
+    return df
+
+def iter_chunks(n_rows, source_path=DATA_PATH, seed=0, chunk_rows=CHUNK_ROWS):
+    """Yields DataFrames totalling n_rows synthetic leads."""
+    rng = np.random.default_rng(seed)
+    source = pd.read_csv(source_path) if source_path and os.path.exists(source_path) else None
+    for start in range(0, n_rows, chunk_rows):
+        size = min(chunk_rows, n_rows - start)
+        yield _bootstrap_chunk(source, start, size, rng) if source is not None else _builtin_chunk(start, size, rng)
+
+def write_csv(path, n_rows, source_path=DATA_PATH, seed=0, chunk_rows=CHUNK_ROWS):
+    """Writes n_rows synthetic leads to path (atomically). Returns the path."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    for i, chunk in enumerate(iter_chunks(n_rows, source_path, seed, chunk_rows)):
+        chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+    os.replace(tmp_path, path)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Lead Scoring.csv-shaped synthetic leads")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--output', required=True, help="CSV path to write")
+    parser.add_argument('--source', default=DATA_PATH,
+                        help="Export to bootstrap from; use --source '' for the built-in generator")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    mode = "bootstrapped from " + args.source if args.source and os.path.exists(args.source) else "built-in generator"
+    print(f"{Fore.CYAN}Generating {args.rows:,} leads ({mode}){Style.RESET_ALL}")
+    start = time.perf_counter()
+    write_csv(args.output, args.rows, source_path=args.source, seed=args.seed)
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"Wrote {args.output} ({size_mb:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import time
+import uuid
+import asyncio
+import backend.ml_service as ml_service
+import backend.rag_service as rag_service
+from backend import metrics
+
+# Bulk email campaigns: a job drafts emails for many leads with a pool of async workers.
+# Results are append-only, so a client can page through them (or resume an SSE stream) by sequence number.
+
+DEFAULT_WORKERS = 4
+MAX_WORKERS = 32
+# Finished campaigns kept in memory for polling; the oldest are dropped beyond this
+MAX_RETAINED_CAMPAIGNS = 100
+
+class CampaignNotFoundError(KeyError):
+    pass
+
+class Campaign:
+    def __init__(self, leads, workers, use_cache=True):
+        self.id = uuid.uuid4().hex
+        self.leads = leads
+        self.workers = workers
+        self.use_cache = use_cache
+        self.status = "queued"
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.results = []
+        self.failed = 0
+        self._changed = asyncio.Condition()
+        self._task = None
+
+    @property
+    def done(self):
+        return self.status in ("completed", "failed", "cancelled")
+
+    def summary(self):
+        return {
+            "campaign_id": self.id,
+            "status": self.status,
+            "total": len(self.leads),
+            "completed": len(self.results),
+            "failed": self.failed,
+            "workers": self.workers,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error
+        }
+
+    async def _publish(self, result=None, status=None):
+        async with self._changed:
+            if result is not None:
+                result["seq"] = len(self.results)
+                self.results.append(result)
+            if status is not None:
+                self.status = status
+                if self.done:
+                    self.finished_at = time.time()
+            self._changed.notify_all()
+
+    async def wait_for(self, cursor, timeout=15.0):
+        """Blocks until there is a result at or past cursor or the campaign finishes (or timeout)."""
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: len(self.results) > cursor or self.done),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                pass
+
+_campaigns = {}
+
+_running_gauge = metrics.gauge('campaigns_running', 'Campaigns queued or running')
+_pending_gauge = metrics.gauge('campaign_leads_pending', 'Leads of unfinished campaigns still waiting for a draft')
+
+@metrics.register_collector
+def _collect_metrics():
+    active = [c for c in list(_campaigns.values()) if not c.done]
+    _running_gauge.set(len(active))
+    _pending_gauge.set(sum(len(c.leads) - len(c.results) for c in active))
+
+def select_leads(lead_ids=None, min_score=None, limit=None):
+    """
+    Resolves campaign targets from the score index: explicit Prospect IDs, or every lead at or
+    above min_score in descending score order. limit caps the count either way.
+    """
+    index = ml_service.current_score_index or ml_service.build_score_index()
+    df = index.df
+
+    if lead_ids:
+        wanted = set(str(i) for i in lead_ids)
+        selected = df[df['Prospect ID'].astype(str).isin(wanted)]
+    else:
+        order = index.top(k=len(index))[0]
+        selected = df.iloc[order]
+        if min_score is not None:
+            selected = selected[selected['ConvertedProbability'] >= min_score]
+
+    if limit is not None:
+        selected = selected.head(limit)
+    return selected.to_dict(orient='records')
+
+async def _run(campaign: Campaign):
+    queue = asyncio.Queue()
+    for lead in campaign.leads:
+        queue.put_nowait(lead)
+
+    async def worker():
+        while True:
+            try:
+                lead = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.time()
+            try:
+                profile = rag_service.lead_profile_from_record(lead)
+                rag = await rag_service.arun_rag_pipeline(profile, use_cache=campaign.use_cache)
+                result = {
+                    "lead_id": lead.get('Prospect ID'),
+                    "recommended_product": rag['recommended_product'],
+                    "email_draft": rag['email_draft'],
+                    "generation_tier": rag.get('generation_tier'),
+                    "error": None
+                }
+            except Exception as e:
+                campaign.failed += 1
+                result = {"lead_id": lead.get('Prospect ID'), "recommended_product": None, "email_draft": None,
+                          "generation_tier": None, "error": str(e)}
+            result["latency"] = time.time() - started
+            await campaign._publish(result=result)
+
+    try:
+        await campaign._publish(status="running")
+        await asyncio.gather(*[worker() for _ in range(campaign.workers)])
+        await campaign._publish(status="completed")
+    except asyncio.CancelledError:
+        await campaign._publish(status="cancelled")
+    except Exception as e:
+        campaign.error = str(e)
+        await campaign._publish(status="failed")
+
+def _evict_finished():
+    finished = [c for c in _campaigns.values() if c.done]
+    for campaign in sorted(finished, key=lambda c: c.created_at)[:max(0, len(_campaigns) - MAX_RETAINED_CAMPAIGNS)]:
+        _campaigns.pop(campaign.id, None)
+
+def start_campaign(leads, workers=DEFAULT_WORKERS, use_cache=True) -> Campaign:
+    """Enqueues a campaign on the running event loop and returns immediately."""
+    _evict_finished()
+    campaign = Campaign(leads, max(1, min(workers, MAX_WORKERS)), use_cache=use_cache)
+    _campaigns[campaign.id] = campaign
+    campaign._task = asyncio.get_running_loop().create_task(_run(campaign))
+    return campaign
+
+def get_campaign(campaign_id: str) -> Campaign:
+    try:
+        return _campaigns[campaign_id]
+    except KeyError:
+        raise CampaignNotFoundError(campaign_id)
+
+def cancel_campaign(campaign_id: str) -> Campaign:
+    campaign = get_campaign(campaign_id)
+    if campaign._task is not None and not campaign.done:
+        campaign._task.cancel()
+        if campaign.status == "queued":
+            # Cancelled before its first step ran, so _run will never record it
+            campaign.status = "cancelled"
+            campaign.finished_at = time.time()
+    return campaign
+
+def get_results(campaign_id: str, cursor=0, limit=100):
+    """One page of results from sequence number `cursor`; pass next_cursor back to continue."""
+    campaign = get_campaign(campaign_id)
+    items = campaign.results[cursor:cursor + limit]
+    return {
+        **campaign.summary(),
+        "results": items,
+        "next_cursor": cursor + len(items)
+    }
+
+async def stream_results(campaign_id: str, cursor=0):
+    """
+    Yields results from `cursor` onward as they complete, ending when the campaign finishes.
+    Yields None when nothing arrived within the wait window, so the caller can send a keep-alive.
+    """
+    campaign = get_campaign(campaign_id)
+    while True:
+        while cursor < len(campaign.results):
+            yield campaign.results[cursor]
+            cursor += 1
+        if campaign.done:
+            return
+        await campaign.wait_for(cursor)
+        if cursor == len(campaign.results) and not campaign.done:
+            yield None
@@ -0,0 +1,152 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from functools import lru_cache
+from langchain_core.documents import Document
+
+# Vector retrieval over the product catalog.
+# The catalog (CATALOG_TEXT or an external file) is parsed into Documents, embedded once with a
+# local CPU embedding model, and persisted in a Chroma collection. Re-embedding only happens when
+# the catalog content changes. Query embeddings are memoised, since many leads share the same signals.
+
+INDEX_DIR = os.environ.get(
+    'CATALOG_INDEX_DIR',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'artifacts', 'catalog_index'))
+)
+# Optional external catalog: same numbered text format as CATALOG_TEXT, or a JSON list of products
+CATALOG_PATH = os.environ.get('CATALOG_PATH')
+COLLECTION_NAME = 'product_catalog'
+QUERY_CACHE_SIZE = 4096
+
+_ITEM_RE = re.compile(r'^\s*\d+\.\s+(?P<name>.+?)\s*$')
+_FIELD_RE = re.compile(r'^\s*-\s*(?P<key>[^:]+):\s*(?P<value>.+?)\s*$')
+
+def _field_key(label: str) -> str:
+    return label.strip().lower().replace(' ', '_')
+
+def parse_catalog_text(text: str):
+    """Parses the numbered catalog format ("1. Name" followed by "- Field: value" lines) into Documents."""
+    products, current = [], None
+    for line in text.splitlines():
+        item = _ITEM_RE.match(line)
+        if item:
+            current = {'name': item.group('name')}
+            products.append(current)
+            continue
+        field = _FIELD_RE.match(line)
+        if field and current is not None:
+            current[_field_key(field.group('key'))] = field.group('value')
+    return [_to_document(p) for p in products]
+
+def _to_document(product: dict) -> Document:
+    name = product['name']
+    description = product.get('description', '')
+    # Label shown to reps and used in prompts: "Name (first sentence of the description)"
+    summary = description.split('.')[0].strip()
+    label = f"{name} ({summary})" if summary else name
+    content = "\n".join(
+        f"{key.replace('_', ' ').title()}: {value}" for key, value in product.items() if key != 'name'
+    )
+    return Document(
+        page_content=f"{name}\n{content}",
+        metadata={
+            'name': name,
+            'label': label,
+            'description': description,
+            'ideal_for': product.get('ideal_for', ''),
+            'key_features': product.get('key_features', '')
+        }
+    )
+
+def load_catalog(default_text: str, path=None):
+    path = path or CATALOG_PATH
+    if not path:
+        return parse_catalog_text(default_text)
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            return [_to_document(_normalise_keys(p)) for p in json.load(f)]
+        return parse_catalog_text(f.read())
+
+def _normalise_keys(product: dict) -> dict:
+    return {_field_key(k): v for k, v in product.items()}
+
+def default_embedding_function():
+    # all-MiniLM-L6-v2 via ONNX Runtime: local and CPU-only, downloaded once into the Chroma cache
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+    return DefaultEmbeddingFunction()
+
+class CatalogIndex:
+    def __init__(self, documents, embedding_function=None, index_dir=INDEX_DIR):
+        import chromadb
+
+        self.documents = documents
+        self.by_name = {d.metadata['name']: d for d in documents}
+        self.embedding_function = embedding_function or default_embedding_function()
+        self._client = chromadb.PersistentClient(path=index_dir)
+        self._collection = self._client.get_or_create_collection(
+            COLLECTION_NAME,
+            embedding_function=None,
+            configuration={"hnsw": {"space": "cosine"}}
+        )
+        self._ingest()
+        self._embed_query = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._embed_query_uncached)
+
+    def _catalog_hash(self):
+        h = hashlib.sha256()
+        for d in self.documents:
+            h.update(d.page_content.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def _ingest(self):
+        """Embeds the catalog only if the persisted collection was built from different content."""
+        digest = self._catalog_hash()
+        metadata = self._collection.metadata or {}
+        if metadata.get('catalog_sha256') == digest and self._collection.count() == len(self.documents):
+            return
+
+        existing = self._collection.get(include=[])['ids']
+        if existing:
+            self._collection.delete(ids=existing)
+        if self.documents:
+            texts = [d.page_content for d in self.documents]
+            self._collection.add(
+                ids=[d.metadata['name'] for d in self.documents],
+                documents=texts,
+                embeddings=[list(map(float, e)) for e in self.embedding_function(texts)],
+                metadatas=[d.metadata for d in self.documents]
+            )
+        self._collection.modify(metadata={'catalog_sha256': digest})
+
+    def _embed_query_uncached(self, query: str):
+        return tuple(float(x) for x in self.embedding_function([query])[0])
+
+    def search(self, query: str, k=1):
+        """Top-k (Document, distance) pairs for a free-text query."""
+        if not self.documents:
+            return []
+        result = self._collection.query(
+            query_embeddings=[list(self._embed_query(query))],
+            n_results=min(k, len(self.documents)),
+            include=['distances']
+        )
+        return [(self.by_name[i], dist) for i, dist in zip(result['ids'][0], result['distances'][0])]
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index(default_text: str):
+    """Shared CatalogIndex for this process, built on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CatalogIndex(load_catalog(default_text))
+    return _index
+
+def query_cache_info():
+    """functools cache_info() of the query-embedding cache, or None before the index is built."""
+    index = _index
+    return index._embed_query.cache_info() if index is not None else None
@@ -0,0 +1,159 @@
+import os
+import json
+import hashlib
+import threading
+import pandas as pd
+from backend import metrics
+
+# Shared dataset layer: parse Lead Scoring.csv once into a typed Parquet cache and
+# memoise the decoded frame per process, so request paths never re-run read_csv.
+
+# Path to data - adjusting for backend/ location (LEAD_DATA_PATH points the service at another export)
+DATA_PATH = os.environ.get(
+    'LEAD_DATA_PATH',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/archive/Lead Scoring.csv'))
+)
+
+CACHE_DIR = os.environ.get(
+    'DATASET_CACHE_DIR',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'artifacts', 'cache'))
+)
+
+# String columns with at most this share of distinct values are stored as categoricals
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+
+_memo = {}
+_memo_lock = threading.Lock()
+# Where load_dataset calls were served from: the in-process memo, the Parquet cache, or a CSV parse
+stats = {"memo": 0, "parquet": 0, "csv": 0}
+
+_lookups = metrics.counter('dataset_cache_lookups_total', 'load_dataset calls by the layer that served them')
+
+@metrics.register_collector
+def _collect_metrics():
+    for layer, count in stats.items():
+        _lookups.set_total(count, layer=layer)
+
+def _file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _cache_paths(source_path):
+    stem = os.path.splitext(os.path.basename(source_path))[0].replace(' ', '_')
+    key = hashlib.sha1(source_path.encode('utf-8')).hexdigest()[:8]
+    base = os.path.join(CACHE_DIR, f"{stem}.{key}")
+    return base + '.parquet', base + '.meta.json'
+
+def _to_typed(df):
+    for col in df.select_dtypes(include=['object', 'string']).columns:
+        if df[col].nunique(dropna=True) <= CATEGORICAL_MAX_UNIQUE_RATIO * max(len(df), 1):
+            df[col] = df[col].astype('category')
+    return df
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_cache(df, parquet_path, meta_path, meta):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_parquet = parquet_path + '.tmp'
+    df.to_parquet(tmp_parquet, index=False)
+    os.replace(tmp_parquet, parquet_path)
+    tmp_meta = meta_path + '.tmp'
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, meta_path)
+
+def _load_typed(source_path, stat):
+    """
+    Returns the typed (categorical) frame for source_path, from the Parquet cache when it is valid.
+    A matching mtime+size trusts the cache outright; otherwise the content hash decides,
+    so a touched-but-unchanged CSV does not trigger a re-parse.
+    """
+    parquet_path, meta_path = _cache_paths(source_path)
+    meta = _read_meta(meta_path)
+    cache_ok = meta is not None and os.path.exists(parquet_path)
+
+    if cache_ok and meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+        stats["parquet"] += 1
+        return pd.read_parquet(parquet_path)
+
+    digest = _file_hash(source_path)
+    new_meta = {'source': source_path, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest}
+
+    if cache_ok and meta.get('sha256') == digest:
+        stats["parquet"] += 1
+        df = pd.read_parquet(parquet_path)
+        try:
+            _write_cache(df, parquet_path, meta_path, new_meta)
+        except OSError:
+            pass
+        return df
+
+    stats["csv"] += 1
+    df = _to_typed(pd.read_csv(source_path))
+    try:
+        _write_cache(df, parquet_path, meta_path, new_meta)
+    except OSError:
+        # Read-only deployments still get the in-process memo
+        pass
+    return df
+
+def _decode_categoricals(df):
+    df = df.copy()
+    for col in df.select_dtypes(include=['category']).columns:
+        # Back to the categories' own dtype (object, or str on pandas >= 3), as read_csv would give
+        df[col] = df[col].astype(df[col].cat.categories.dtype)
+    return df
+
+def load_dataset(path=None, categorical=False):
+    """
+    Returns the lead dataset, parsed at most once per source version per process.
+    With categorical=False (default) string columns come back as object dtype, matching pd.read_csv.
+    The result is a shallow copy of a shared frame: add or replace columns freely,
+    but do not modify existing columns in place.
+    """
+    source_path = os.path.abspath(path or DATA_PATH)
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Dataset not found at {source_path}")
+    stat = os.stat(source_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _memo_lock:
+        entry = _memo.get(source_path)
+        if entry is None or entry['version'] != version:
+            entry = {'version': version, 'typed': _load_typed(source_path, stat), 'decoded': None}
+            _memo[source_path] = entry
+        else:
+            stats["memo"] += 1
+        if categorical:
+            df = entry['typed']
+        else:
+            if entry['decoded'] is None:
+                entry['decoded'] = _decode_categoricals(entry['typed'])
+            df = entry['decoded']
+
+    return df.copy(deep=False)
+
+def dataset_fingerprint(path=None):
+    """
+    SHA-256 of the source file, for keying caches derived from the data.
+    Read from the Parquet cache metadata when it is current, so the file is not re-hashed.
+    """
+    source_path = os.path.abspath(path or DATA_PATH)
+    stat = os.stat(source_path)
+    meta = _read_meta(_cache_paths(source_path)[1])
+    if meta is not None and meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+        return meta['sha256']
+    return _file_hash(source_path)
+
+def clear_cache():
+    """Drops the in-process memo (the on-disk cache is kept)."""
+    with _memo_lock:
+        _memo.clear()
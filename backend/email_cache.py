@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Content-addressed cache for generated emails.
+# Keyed by a hash of the rendered prompt plus model parameters, so identical inputs never hit the LLM twice.
+# Two layers: an in-memory LRU in front of an optional SQLite file shared across restarts and workers.
+# Async callers use aget/aput: the memory layer is read inline, SQLite runs in a worker thread.
+
+DEFAULT_TTL_SECONDS = int(os.environ.get('EMAIL_CACHE_TTL', str(24 * 3600)))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('EMAIL_CACHE_MAX_ENTRIES', '1024'))
+DEFAULT_MAX_DISK_ENTRIES = int(os.environ.get('EMAIL_CACHE_MAX_DISK_ENTRIES', '100000'))
+# Empty string disables the on-disk layer
+DEFAULT_DB_PATH = os.environ.get(
+    'EMAIL_CACHE_DB',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'artifacts', 'email_cache.sqlite3'))
+)
+
+def make_key(prompt: str, model_params: dict) -> str:
+    payload = json.dumps({"prompt": prompt, "params": model_params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class EmailCache:
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES,
+                 db_path=DEFAULT_DB_PATH, max_disk_entries=DEFAULT_MAX_DISK_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.db_path = db_path or None
+        self._memory = OrderedDict() # key -> (expires_at, value)
+        # _lock guards the memory layer and stats; _db_lock the SQLite connection, so a slow disk
+        # query never holds up memory lookups on the event loop
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    def _connection(self):
+        # Lazily opened so importing the service never touches the filesystem
+        if self._db is None and self.db_path:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS emails (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS emails_created ON emails (created_at)")
+        return self._db
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _memory_get(self, key, now):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+            if self.db_path is None:
+                self.stats["misses"] += 1
+            return None
+
+    def _disk_get(self, key, now):
+        with self._db_lock:
+            row = self._connection().execute("SELECT value, expires_at FROM emails WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row is not None and row[1] > now:
+                self._remember(key, row[1], row[0])
+                self.stats["disk_hits"] += 1
+                return row[0]
+            self.stats["misses"] += 1
+            return None
+
+    def get(self, key):
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is None and self.db_path is not None:
+            value = self._disk_get(key, now)
+        return value
+
+    async def aget(self, key):
+        """get() for the event loop: the memory layer is read inline, a SQLite lookup runs in a thread."""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is None and self.db_path is not None:
+            value = await asyncio.to_thread(self._disk_get, key, now)
+        return value
+
+    def _memory_put(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self.stats["writes"] += 1
+            # Amortised cleanup: expire and trim to size every few hundred writes
+            trim = self.stats["writes"] % 256 == 0
+        return now, expires_at, trim
+
+    def _disk_put(self, key, value, now, expires_at, trim):
+        with self._db_lock:
+            db = self._connection()
+            db.execute("INSERT OR REPLACE INTO emails VALUES (?, ?, ?, ?)", (key, value, now, expires_at))
+            if trim:
+                self._trim_disk(now)
+
+    def put(self, key, value):
+        now, expires_at, trim = self._memory_put(key, value)
+        if self.db_path is not None:
+            self._disk_put(key, value, now, expires_at, trim)
+
+    async def aput(self, key, value):
+        """put() for the event loop: the memory layer is updated inline, the SQLite write runs in a thread."""
+        now, expires_at, trim = self._memory_put(key, value)
+        if self.db_path is not None:
+            await asyncio.to_thread(self._disk_put, key, value, now, expires_at, trim)
+
+    def _trim_disk(self, now):
+        db = self._connection()
+        db.execute("DELETE FROM emails WHERE expires_at <= ?", (now,))
+        db.execute(
+            "DELETE FROM emails WHERE key IN (SELECT key FROM emails ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM emails")
+
+    def summary(self):
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_enabled": self.db_path is not None,
+                "ttl_seconds": self.ttl_seconds
+            }
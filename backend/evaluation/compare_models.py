@@ -1,8 +1,16 @@
 import pandas as pd
+import numpy as np
 import os
 import sys
+import json
 import time
-from sklearn.model_selection import train_test_split
+import hashlib
+import inspect
+import argparse
+import importlib
+import joblib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sklearn.model_selection import train_test_split, StratifiedKFold
 from sklearn.ensemble import RandomForestClassifier
 from lightgbm import LGBMClassifier
 from sklearn.preprocessing import OneHotEncoder
@@ -15,15 +23,26 @@ from colorama import Fore, Style, init
 # Add parent directory to path to import backend modules if needed, roughly just for finding data
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
+from backend.dataset import DATA_PATH, load_dataset, dataset_fingerprint
+from backend.gains import capture_rates, bootstrap_capture
+import backend.features as features_module
+from backend.features import engineer_features, ENGINEERED_FEATURES
+
 init(autoreset=True)
 
-# Path to data
-DATA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../data/archive/Lead Scoring.csv'))
+# Fitted preprocessors and transformed matrices, shared by every model on the same feature set and fold
+CACHE_DIR = os.environ.get(
+    'COMPARE_CACHE_DIR',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'artifacts', 'compare_cache'))
+)
+
+CAPTURE_PERCENTILES = (1, 5, 10, 20)
+
+BASE_FEATURES = ['Lead Origin', 'Lead Source', 'Total Time Spent on Website', 'Last Activity', 'Tags']
+TARGET = 'Converted'
 
 def load_data():
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"Dataset not found at {DATA_PATH}")
-    return pd.read_csv(DATA_PATH)
+    return load_dataset(DATA_PATH)
 
 def get_preprocessor():
     numeric_features = ['Total Time Spent on Website']
@@ -43,7 +62,7 @@ def get_preprocessor():
         ])
     return preprocessor
 
-def evaluate_model(name, clf, X_train, y_train, X_test, y_test):
+def evaluate_model(name, clf, X_train, y_train, X_test, y_test, n_bootstrap=0):
     print(f"\n{Fore.CYAN}Training {name}...{Style.RESET_ALL}")
     start_time = time.time()
     clf.fit(X_train, y_train)
@@ -53,29 +72,11 @@ def evaluate_model(name, clf, X_train, y_train, X_test, y_test):
     start_time = time.time()
     y_pred = clf.predict(X_test)
     y_proba = clf.predict_proba(X_test)[:, 1]
-    inference_time = (time.time() - start_time) / len(X_test) # per sample
+    inference_time = (time.time() - start_time) / X_test.shape[0] # per sample
     
     
-    # Custom Metric: Top N% Capture Rate
-    def get_capture_rate(y_true, probas, percentile):
-        # Create a DF to sort
-        temp_df = pd.DataFrame({'true': y_true.values, 'proba': probas})
-        temp_df = temp_df.sort_values('proba', ascending=False)
-        
-        # Select Top N%
-        k = int(len(temp_df) * (percentile / 100))
-        top_k = temp_df.head(k)
-        
-        # Calculate captured conversions
-        captured = top_k['true'].sum()
-        total = temp_df['true'].sum()
-        
-        return captured / total if total > 0 else 0
-
-    capture_1 = get_capture_rate(y_test, y_proba, 1)
-    capture_5 = get_capture_rate(y_test, y_proba, 5)
-    capture_10 = get_capture_rate(y_test, y_proba, 10)
-    capture_20 = get_capture_rate(y_test, y_proba, 20)
+    # Custom Metric: Top N% Capture Rate (one sort for the whole grid, see backend/gains.py)
+    captures = capture_rates(y_test, y_proba, CAPTURE_PERCENTILES)
     
     # Metrics
     acc = accuracy_score(y_test, y_pred)
@@ -101,41 +102,22 @@ def evaluate_model(name, clf, X_train, y_train, X_test, y_test):
         "ROC-AUC": auc,
         "train_time": train_time,
         "inference_time": inference_time,
-        "Top 1% Capture": capture_1,
-        "Top 5% Capture": capture_5,
-        "Top 10% Capture": capture_10,
-        "Top 20% Capture": capture_20
+        **{f"Top {p}% Capture": c for p, c in zip(CAPTURE_PERCENTILES, captures)},
+        **_capture_intervals(y_test, y_proba, n_bootstrap)
     }
 
-def engineer_features(df):
-    df = df.copy()
-    
-    # 1. High Intent Tags (Domain Knowledge)
-    high_intent_tags = ['Will revert after reading the email', 'Closed by Horizzon', 'Lost to EINS', 'Interested in other courses']
-    # Handle NaN
-    df['Tags'] = df['Tags'].fillna('Unknown')
-    df['Has_High_Intent_Tag'] = df['Tags'].apply(lambda x: 1 if x in high_intent_tags else 0)
-    
-    # 2. Activity Score (Heuristic)
-    activity_scores = {
-        'SMS Sent': 10,
-        'Email Opened': 8,
-        'Page Visited on Website': 6,
-        'Olark Chat Conversation': 5,
-        'Converted to Lead': 4,
-        'Email Bounced': -2,
-        'Unreachable': -2
-    }
-    df['Last Activity'] = df['Last Activity'].fillna('Unknown')
-    df['Activity_Score'] = df['Last Activity'].map(activity_scores).fillna(0)
-    
-    # 3. Interaction: Time * Activity Score
-    df['Time_Activity_Interaction'] = df['Total Time Spent on Website'] * df['Activity_Score']
-    
-    return df
+def _capture_intervals(y_true, y_proba, n_bootstrap):
+    if not n_bootstrap:
+        return {}
+    ci = bootstrap_capture(y_true, y_proba, CAPTURE_PERCENTILES, n_boot=n_bootstrap, random_state=42)
+    columns = {}
+    for p, low, high in zip(CAPTURE_PERCENTILES, ci["CI Low"], ci["CI High"]):
+        columns[f"Top {p}% Capture CI Low"] = low
+        columns[f"Top {p}% Capture CI High"] = high
+    return columns
 
 def get_fe_preprocessor():
-    numeric_features = ['Total Time Spent on Website', 'Has_High_Intent_Tag', 'Activity_Score', 'Time_Activity_Interaction']
+    numeric_features = ['Total Time Spent on Website'] + ENGINEERED_FEATURES
     categorical_features = ['Lead Origin', 'Lead Source', 'Last Activity', 'Tags']
     
     numeric_transformer = SimpleImputer(strategy='median')
@@ -152,49 +134,169 @@ def get_fe_preprocessor():
         ])
     return preprocessor
 
+# Feature sets: (raw columns, preprocessor factory, whether feature engineering is applied first)
+FEATURE_SETS = {
+    "base": (BASE_FEATURES, get_preprocessor, False),
+    "fe": (BASE_FEATURES + ENGINEERED_FEATURES, get_fe_preprocessor, True)
+}
+
+# Pluggable model registry: name -> feature set + factory returning an unfitted classifier.
+# Extra candidates can live in any module that calls register_model; pass it with --registry.
+MODEL_REGISTRY = {}
+
+def register_model(name, feature_set="base"):
+    def decorator(factory):
+        MODEL_REGISTRY[name] = {"feature_set": feature_set, "factory": factory}
+        return factory
+    return decorator
+
+@register_model("Random Forest")
+def _random_forest():
+    return RandomForestClassifier(random_state=42, n_estimators=100)
+
+@register_model("LightGBM")
+def _lightgbm():
+    return LGBMClassifier(random_state=42, verbose=-1)
+
+@register_model("LightGBM + FE", feature_set="fe")
+def _lightgbm_fe():
+    return LGBMClassifier(random_state=42, verbose=-1)
+
+def _load_plugins(modules):
+    for module in modules or []:
+        importlib.import_module(module)
+
+def make_splits(y, cv=None, test_size=0.2, random_state=42):
+    """Holdout (same partition as the original train_test_split) or stratified k-fold, as index arrays."""
+    indices = np.arange(len(y))
+    if cv:
+        return list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state).split(indices, y))
+    train_idx, test_idx = train_test_split(indices, test_size=test_size, random_state=random_state)
+    return [(train_idx, test_idx)]
+
+def feature_set_signature(feature_set):
+    """
+    Hash of everything that defines a feature set's matrices: its columns, the preprocessor factory
+    (source and parameters) and, when feature engineering applies, the backend.features source.
+    Editing any of them invalidates the cached matrices.
+    """
+    columns, make_preprocessor, apply_fe = FEATURE_SETS[feature_set]
+    params = sorted((k, repr(v)) for k, v in make_preprocessor().get_params(deep=True).items())
+    parts = [repr(list(columns)), inspect.getsource(make_preprocessor), repr(params)]
+    if apply_fe:
+        parts.append(inspect.getsource(features_module))
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()[:16]
+
+def prepare_matrices(df, feature_set, splits, split_spec, fingerprint, cache_dir=CACHE_DIR, refresh=False):
+    """
+    Fits the feature set's preprocessor once per fold and saves the transformed matrices.
+    Returns one cache file path per fold; files are reused across runs while the data, split and
+    feature-set definition are unchanged. refresh=True rebuilds them regardless.
+    """
+    columns, make_preprocessor, apply_fe = FEATURE_SETS[feature_set]
+    signature = feature_set_signature(feature_set)
+    os.makedirs(cache_dir, exist_ok=True)
+    data = None
+    paths = []
+    for fold, (train_idx, test_idx) in enumerate(splits):
+        key = hashlib.sha1(f"{fingerprint}|{feature_set}|{signature}|{split_spec}|{fold}".encode('utf-8')).hexdigest()[:16]
+        path = os.path.join(cache_dir, f"{feature_set}-fold{fold}-{key}.joblib")
+        paths.append(path)
+        if os.path.exists(path) and not refresh:
+            continue
+        if data is None:
+            data = engineer_features(df) if apply_fe else df
+        X, y = data[columns], data[TARGET].to_numpy()
+
+        start_time = time.time()
+        preprocessor = make_preprocessor()
+        X_train = preprocessor.fit_transform(X.iloc[train_idx])
+        X_test = preprocessor.transform(X.iloc[test_idx])
+        preprocess_time = time.time() - start_time
+
+        tmp_path = path + '.tmp'
+        joblib.dump({
+            "preprocessor": preprocessor,
+            "X_train": X_train, "y_train": y[train_idx],
+            "X_test": X_test, "y_test": y[test_idx],
+            "preprocess_time": preprocess_time
+        }, tmp_path)
+        os.replace(tmp_path, path)
+    return paths
+
+def _run_task(model_name, fold, path, plugins=None, n_bootstrap=0):
+    # Runs in a worker process: matrices are memory-mapped from the shared cache, not re-transformed
+    _load_plugins(plugins)
+    prepared = joblib.load(path, mmap_mode='r')
+    clf = MODEL_REGISTRY[model_name]["factory"]()
+    result = evaluate_model(model_name, clf, prepared["X_train"], prepared["y_train"],
+                            prepared["X_test"], prepared["y_test"], n_bootstrap)
+    result["Fold"] = fold
+    result["Feature Set"] = MODEL_REGISTRY[model_name]["feature_set"]
+    result["preprocess_time"] = prepared["preprocess_time"]
+    return result
+
+def summarise(fold_results):
+    """Mean over folds per model (plus std of the headline metrics when there is more than one fold)."""
+    folds_df = pd.DataFrame(fold_results)
+    metric_cols = [c for c in folds_df.columns if c not in ("Model", "Fold", "Feature Set")]
+    summary = folds_df.groupby("Model", sort=False)[metric_cols].mean()
+    if folds_df["Fold"].nunique() > 1:
+        for col in ("ROC-AUC", "Top 10% Capture"):
+            summary[f"{col} Std"] = folds_df.groupby("Model", sort=False)[col].std()
+    return summary.reset_index()
+
 def main():
+    parser = argparse.ArgumentParser(description="Benchmark lead scoring models")
+    parser.add_argument('--models', nargs='*', default=None, help="Registered model names to run (default: all)")
+    parser.add_argument('--registry', nargs='*', default=None,
+                        help="Modules to import that register extra models via register_model")
+    parser.add_argument('--cv', type=int, default=None, help="Stratified k-fold CV instead of a single holdout split")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (default: one per task, up to CPU count)")
+    parser.add_argument('--bootstrap', type=int, default=0,
+                        help="Bootstrap resamples for capture-rate confidence intervals (0 = off)")
+    parser.add_argument('--output', default='model_comparison', help="Path prefix for the .json and .csv results")
+    parser.add_argument('--refresh', action='store_true', help="Rebuild the cached feature matrices")
+    args = parser.parse_args()
+
+    _load_plugins(args.registry)
+    model_names = args.models or list(MODEL_REGISTRY)
+    unknown = [m for m in model_names if m not in MODEL_REGISTRY]
+    if unknown:
+        raise SystemExit(f"Unknown models {unknown}; registered: {list(MODEL_REGISTRY)}")
+
     print(f"{Fore.GREEN}Loading Data...{Style.RESET_ALL}")
     df = load_data()
-    
-    # Base Features
-    base_features = ['Lead Origin', 'Lead Source', 'Total Time Spent on Website', 'Last Activity', 'Tags']
-    target = 'Converted'
-    
-    # Apply FE to a copy for the FE model
-    df_fe = engineer_features(df)
-    
-    # Split Base Data
-    X = df[base_features]
-    y = df[target]
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # Split FE Data (Ensure same random state for apples-to-apples comparison)
-    fe_features = base_features + ['Has_High_Intent_Tag', 'Activity_Score', 'Time_Activity_Interaction']
-    X_fe = df_fe[fe_features]
-    y_fe = df_fe[target]
-    X_train_fe, X_test_fe, y_train_fe, y_test_fe = train_test_split(X_fe, y_fe, test_size=0.2, random_state=42)
-    
-    # Models to Compare
-    preprocessor = get_preprocessor()
-    preprocessor_fe = get_fe_preprocessor()
-    
-    rf_pipeline = Pipeline(steps=[('preprocessor', preprocessor),
-                                  ('classifier', RandomForestClassifier(random_state=42, n_estimators=100))])
-    
-    lgbm_pipeline = Pipeline(steps=[('preprocessor', preprocessor),
-                                    ('classifier', LGBMClassifier(random_state=42, verbose=-1))])
-    
-    lgbm_fe_pipeline = Pipeline(steps=[('preprocessor', preprocessor_fe),
-                                       ('classifier', LGBMClassifier(random_state=42, verbose=-1))])
-    
-    results = []
-    
-    results.append(evaluate_model("Random Forest", rf_pipeline, X_train, y_train, X_test, y_test))
-    results.append(evaluate_model("LightGBM", lgbm_pipeline, X_train, y_train, X_test, y_test))
-    results.append(evaluate_model("LightGBM + FE", lgbm_fe_pipeline, X_train_fe, y_train_fe, X_test_fe, y_test_fe))
-    
+    splits = make_splits(df[TARGET].to_numpy(), cv=args.cv, test_size=args.test_size)
+    split_spec = f"cv={args.cv}" if args.cv else f"holdout={args.test_size}"
+
+    # Preprocess each feature set once per fold; all models on that feature set reuse it
+    print(f"{Fore.GREEN}Preparing features ({split_spec})...{Style.RESET_ALL}")
+    fingerprint = dataset_fingerprint(DATA_PATH)
+    feature_sets = {MODEL_REGISTRY[m]["feature_set"] for m in model_names}
+    prepared = {fs: prepare_matrices(df, fs, splits, split_spec, fingerprint, refresh=args.refresh)
+                for fs in sorted(feature_sets)}
+
+    tasks = [(m, fold, prepared[MODEL_REGISTRY[m]["feature_set"]][fold])
+             for m in model_names for fold in range(len(splits))]
+    jobs = args.jobs or min(len(tasks), os.cpu_count() or 1)
+
+    fold_results = []
+    if jobs <= 1:
+        for task in tasks:
+            fold_results.append(_run_task(*task, args.registry, args.bootstrap))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_run_task, *task, args.registry, args.bootstrap) for task in tasks]
+            for future in as_completed(futures):
+                fold_results.append(future.result())
+    # Stable, registry order regardless of completion order
+    order = {name: i for i, name in enumerate(model_names)}
+    fold_results.sort(key=lambda r: (order[r["Model"]], r["Fold"]))
+
     # Display Results
-    results_df = pd.DataFrame(results)
+    results_df = summarise(fold_results)
     
     print(f"\n{Fore.YELLOW}=== Model Comparison Results ==={Style.RESET_ALL}")
     print(results_df.to_string(index=False, float_format="%.4f"))
@@ -206,5 +308,16 @@ def main():
     best_capture = results_df.loc[results_df['Top 10% Capture'].idxmax()]
     print(f"Best Top 10% Capture: {best_capture['Model']} ({best_capture['Top 10% Capture']:.4f})")
 
+    # Machine-readable results
+    results_df.to_csv(f"{args.output}.csv", index=False)
+    with open(f"{args.output}.json", 'w', encoding='utf-8') as f:
+        json.dump({
+            "split": split_spec,
+            "dataset_sha256": fingerprint,
+            "summary": results_df.to_dict(orient='records'),
+            "folds": fold_results
+        }, f, indent=2, default=float)
+    print(f"Results saved to: {args.output}.json, {args.output}.csv")
+
 if __name__ == "__main__":
     main()
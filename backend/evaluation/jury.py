@@ -2,17 +2,9 @@ import json
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from backend.usage import UsageCallback
 
-class Jurist:
-    def __init__(self, name: str, role_description: str, evaluation_criteria: str, model: str = "mistral"):
-        self.name = name
-        self.role_description = role_description
-        self.evaluation_criteria = evaluation_criteria
-        self.model = model
-        self.llm = ChatOllama(model=model, temperature=0.1) # Low temp for consistent judging
-
-    def evaluate(self, email_draft: str, lead_context: dict, product_context: str) -> dict:
-        template = """
+JURIST_TEMPLATE = """
         Role: {role_description}
         
         Task: You are acting as a stakeholder reviewing an AI-generated sales email.
@@ -37,23 +29,46 @@ class Jurist:
             "reasoning": "<short explanation>"
         }}
         """
-        
-        prompt = PromptTemplate.from_template(template)
-        chain = prompt | self.llm | StrOutputParser()
-        
+
+JURIST_PROMPT = PromptTemplate.from_template(JURIST_TEMPLATE)
+
+def parse_json_response(response_str: str):
+    # Clean up response to ensure typical JSON issues (like backticks) are handled
+    cleaned_response = response_str.strip().replace("```json", "").replace("```", "")
+    return json.loads(cleaned_response)
+
+class Jurist:
+    def __init__(self, name: str, role_description: str, evaluation_criteria: str, model: str = "mistral"):
+        self.name = name
+        self.role_description = role_description
+        self.evaluation_criteria = evaluation_criteria
+        self.model = model
+        # Low temp for consistent judging; token usage is recorded under "jury"
+        self.llm = ChatOllama(model=model, temperature=0.1, callbacks=[UsageCallback('jury')])
+        # Built once; evaluate() only fills in the variables
+        self.chain = JURIST_PROMPT | self.llm | StrOutputParser()
+
+    def _inputs(self, email_draft: str, lead_context: dict, product_context: str) -> dict:
+        return {
+            "role_description": self.role_description,
+            "lead_source": lead_context.get('Lead Source', 'Unknown'),
+            "lead_tags": lead_context.get('Tags', 'None'),
+            "product": product_context,
+            "email_draft": email_draft,
+            "evaluation_criteria": self.evaluation_criteria
+        }
+
+    def evaluate(self, email_draft: str, lead_context: dict, product_context: str) -> dict:
         try:
-            response_str = chain.invoke({
-                "role_description": self.role_description,
-                "lead_source": lead_context.get('Lead Source', 'Unknown'),
-                "lead_tags": lead_context.get('Tags', 'None'),
-                "product": product_context,
-                "email_draft": email_draft,
-                "evaluation_criteria": self.evaluation_criteria
-            })
-            
-            # Clean up response to ensure typical JSON issues (like backticks) are handled
-            cleaned_response = response_str.strip().replace("```json", "").replace("```", "")
-            return json.loads(cleaned_response)
+            response_str = self.chain.invoke(self._inputs(email_draft, lead_context, product_context))
+            return parse_json_response(response_str)
+        except Exception as e:
+            return {"score": 0, "reasoning": f"Evaluation Failed: {str(e)}"}
+
+    async def aevaluate(self, email_draft: str, lead_context: dict, product_context: str) -> dict:
+        try:
+            response_str = await self.chain.ainvoke(self._inputs(email_draft, lead_context, product_context))
+            return parse_json_response(response_str)
         except Exception as e:
             return {"score": 0, "reasoning": f"Evaluation Failed: {str(e)}"}
 
@@ -77,3 +92,84 @@ COMPLIANCE_OFFICER = Jurist(
 )
 
 JURY_PANEL = [SALES_Director, BRAND_MANAGER, COMPLIANCE_OFFICER]
+
+BATCHED_JURY_TEMPLATE = """
+        Task: You are a review board of stakeholders assessing an AI-generated sales email.
+        Score the email once for EACH reviewer below, strictly from that reviewer's perspective.
+        
+        Context:
+        - Lead Source: {lead_source}
+        - Lead Tags: {lead_tags}
+        - Product Being Pitched: {product}
+        
+        Email Draft to Review:
+        "
+        {email_draft}
+        "
+        
+        Reviewers:
+        {reviewers}
+        
+        Output Format:
+        Return ONLY a JSON object with one entry per reviewer id:
+        {{
+            "<reviewer id>": {{"score": <int 1-10>, "reasoning": "<short explanation>"}}
+        }}
+        """
+
+BATCHED_JURY_PROMPT = PromptTemplate.from_template(BATCHED_JURY_TEMPLATE)
+
+def persona_id(jurist: Jurist) -> str:
+    return jurist.name.lower().replace(' ', '_')
+
+class BatchedJury:
+    """
+    Scores every rubric of a jury panel with one LLM call instead of one call per jurist.
+    The email and context are sent (and prefilled) once; JSON mode keeps the output parseable.
+    evaluate() returns verdicts aligned with `jurists`, in the same shape as Jurist.evaluate.
+    """
+    def __init__(self, jurists, model: str = "mistral"):
+        self.jurists = list(jurists)
+        self.model = model
+        self.llm = ChatOllama(model=model, temperature=0.1, format="json", callbacks=[UsageCallback('jury')])
+        self.chain = BATCHED_JURY_PROMPT | self.llm | StrOutputParser()
+        self.reviewers = "\n        ".join(
+            f"- id: {persona_id(j)}\n          Role: {j.role_description}\n          Criteria: {j.evaluation_criteria}"
+            for j in self.jurists
+        )
+
+    def _inputs(self, email_draft: str, lead_context: dict, product_context: str) -> dict:
+        return {
+            "lead_source": lead_context.get('Lead Source', 'Unknown'),
+            "lead_tags": lead_context.get('Tags', 'None'),
+            "product": product_context,
+            "email_draft": email_draft,
+            "reviewers": self.reviewers
+        }
+
+    def _split(self, response_str: str):
+        parsed = parse_json_response(response_str)
+        verdicts = []
+        for jurist in self.jurists:
+            verdict = parsed.get(persona_id(jurist)) or parsed.get(jurist.name)
+            if not isinstance(verdict, dict):
+                verdict = {"score": 0, "reasoning": "Evaluation Failed: no verdict returned for this reviewer"}
+            verdicts.append(verdict)
+        return verdicts
+
+    def _failed(self, e):
+        return [{"score": 0, "reasoning": f"Evaluation Failed: {str(e)}"} for _ in self.jurists]
+
+    def evaluate(self, email_draft: str, lead_context: dict, product_context: str) -> list:
+        try:
+            return self._split(self.chain.invoke(self._inputs(email_draft, lead_context, product_context)))
+        except Exception as e:
+            return self._failed(e)
+
+    async def aevaluate(self, email_draft: str, lead_context: dict, product_context: str) -> list:
+        try:
+            return self._split(await self.chain.ainvoke(self._inputs(email_draft, lead_context, product_context)))
+        except Exception as e:
+            return self._failed(e)
+
+BATCHED_JURY = BatchedJury(JURY_PANEL)
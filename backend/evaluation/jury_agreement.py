@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from colorama import Fore, Style, init
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from backend import rag_service
+from backend.dataset import load_dataset
+from backend.evaluation.jury import JURY_PANEL, BATCHED_JURY
+
+init(autoreset=True)
+
+# Validation harness: scores the same drafts with the three-call panel and the single-call batched jury,
+# then reports how closely the batched scores track the panel per persona, and what each mode cost.
+
+def _score(verdict):
+    try:
+        return float(verdict.get('score', 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+async def _compare_lead(lead, limiter):
+    lead_profile = rag_service.lead_profile_from_record(lead)
+    async with limiter:
+        # Drafts may come from the email cache; only the judging is being compared
+        try:
+            result = await rag_service.arun_rag_pipeline(lead_profile)
+        except rag_service.GenerationError as e:
+            print(f"{Fore.RED}Skipping lead: {e}{Style.RESET_ALL}")
+            return None
+    email_draft, product = result['email_draft'], result['recommended_product']
+
+    async def timed(coro):
+        async with limiter:
+            start = time.perf_counter()
+            value = await coro
+            return value, time.perf_counter() - start
+
+    async def panel():
+        verdicts = await asyncio.gather(*[timed(j.aevaluate(email_draft, lead_profile, product)) for j in JURY_PANEL])
+        # Sum of call times = LLM time spent, independent of how they overlapped
+        return [v for v, _ in verdicts], sum(t for _, t in verdicts)
+
+    (panel_verdicts, panel_llm_time), (batched_verdicts, batched_llm_time) = await asyncio.gather(
+        panel(), timed(BATCHED_JURY.aevaluate(email_draft, lead_profile, product))
+    )
+    return {
+        "panel": [_score(v) for v in panel_verdicts],
+        "batched": [_score(v) for v in batched_verdicts],
+        "panel_llm_time": panel_llm_time,
+        "batched_llm_time": batched_llm_time
+    }
+
+async def _compare(leads, concurrency):
+    limiter = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.ensure_future(_compare_lead(lead, limiter)) for lead in leads]
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Judging"):
+        await task
+    # Leads whose draft could not be generated are left out
+    return [task.result() for task in tasks if task.result() is not None]
+
+def agreement_stats(panel_scores, batched_scores):
+    """Per-persona agreement between two (n_leads, n_personas) score matrices."""
+    panel_scores = np.asarray(panel_scores, dtype=float)
+    batched_scores = np.asarray(batched_scores, dtype=float)
+    diff = np.abs(panel_scores - batched_scores)
+
+    rows = []
+    for col, jurist in enumerate(JURY_PANEL):
+        p, b = panel_scores[:, col], batched_scores[:, col]
+        corr = np.corrcoef(p, b)[0, 1] if len(p) > 1 and p.std() > 0 and b.std() > 0 else float('nan')
+        rows.append({
+            "Persona": jurist.name,
+            "Panel Mean": p.mean(),
+            "Batched Mean": b.mean(),
+            "MAE": diff[:, col].mean(),
+            "Exact Agree": (diff[:, col] == 0).mean(),
+            "Within 1": (diff[:, col] <= 1).mean(),
+            "Pearson r": corr
+        })
+    rows.append({
+        "Persona": "Overall (lead average)",
+        "Panel Mean": panel_scores.mean(),
+        "Batched Mean": batched_scores.mean(),
+        "MAE": np.abs(panel_scores.mean(axis=1) - batched_scores.mean(axis=1)).mean(),
+        "Exact Agree": (diff == 0).mean(),
+        "Within 1": (diff <= 1).mean(),
+        "Pearson r": float('nan')
+    })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Agreement between batched (1-call) and panel (3-call) jury modes")
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--output', default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    df = load_dataset()
+    leads = df[df['Converted'] == 1].sample(args.samples, random_state=42).to_dict(orient='records')
+
+    results = asyncio.run(_compare(leads, args.concurrency))
+
+    rows = agreement_stats([r['panel'] for r in results], [r['batched'] for r in results])
+    results_df = pd.DataFrame(rows)
+    print(f"\n{Fore.YELLOW}=== Batched vs Panel Jury Agreement ({len(results)} leads) ==={Style.RESET_ALL}")
+    print(results_df.to_string(index=False, float_format="%.3f"))
+
+    panel_time = sum(r['panel_llm_time'] for r in results)
+    batched_time = sum(r['batched_llm_time'] for r in results)
+    print(f"\n{Fore.GREEN}Cost:{Style.RESET_ALL}")
+    print(f"Panel:   {len(JURY_PANEL) * len(results)} LLM calls, {panel_time:.1f}s LLM time")
+    print(f"Batched: {len(results)} LLM calls, {batched_time:.1f}s LLM time")
+    if batched_time > 0:
+        print(f"Speedup: {panel_time / batched_time:.2f}x")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                "samples": len(results),
+                "agreement": rows,
+                "panel_llm_seconds": panel_time,
+                "batched_llm_seconds": batched_time,
+                "per_lead": results
+            }, f, indent=2, default=float)
+        print(f"Results saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import os
 import time
 import sys
+import asyncio
+import argparse
 import pandas as pd
 from tqdm import tqdm
 from colorama import Fore, Style, init
@@ -9,111 +11,211 @@ from langchain_ollama import ChatOllama
 # Add parent directory to path to import backend modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from backend import rag_service
-from backend.evaluation.jury import JURY_PANEL
+from backend import rag_service, usage
+from backend.dataset import load_dataset
+from backend.evaluation.jury import JURY_PANEL, BATCHED_JURY
+from backend.evaluation.run_store import RunStore
 
 init(autoreset=True)
 
-def run_evaluation(num_samples=5):
-    print(f"{Fore.CYAN}=======================================================")
-    print(f"{Fore.CYAN}   Hybrid AI Sales Agent - Corporate Jury Evaluation   ")
-    print(f"{Fore.CYAN}======================================================={Style.RESET_ALL}")
-    print(f"Running on recognized hardware (Ollama auto-detection).")
-    print(f"Jury Panel: {[j.name for j in JURY_PANEL]}")
-    print(f"Samples: {num_samples} Random Leads\n")
+# Max LLM calls in flight across generation and jurists.
+# Generation is additionally capped per tier by rag_service.LLM_TIERS.
+DEFAULT_CONCURRENCY = int(os.environ.get('EVAL_CONCURRENCY', '4'))
 
-    # Load Data directly
-    try:
-        # Resolve absolute path: run_evals.py -> evaluation -> backend -> lead_generation(inner) -> lead_generation(outer) -> data
-        data_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../data/archive/Lead Scoring.csv'))
-        df = pd.read_csv(data_path)
-        # Filter for high quality leads to make simulation realistic
-        high_value_leads = df[df['Converted'] == 1].sample(num_samples).to_dict(orient='records')
-    except Exception as e:
-        print(f"{Fore.RED}Error loading data: {e}")
-        return
+REPORT_PATH = 'evaluation_report.md'
+
+async def _evaluate_lead(lead_index: int, lead: dict, limiter: asyncio.Semaphore, store: RunStore,
+                         jury_mode: str = "panel", on_complete=None):
+    """Generates and judges one lead, skipping any step the run store already holds."""
+    # Built as campaigns do, since we are bypassing the API layer
+    lead_profile = rag_service.lead_profile_from_record(lead)
+
+    # 1. Measure Latency & Generate (never from the email cache: we are measuring the model)
+    generation = store.generation(lead_index)
+    regenerated = generation is None
+    if regenerated:
+        async with limiter:
+            start_time = time.time()
+            try:
+                result = await rag_service.arun_rag_pipeline(lead_profile, use_cache=False)
+            except rag_service.GenerationError as e:
+                # Recorded as failed (retried on --resume); there is no draft to judge
+                store.record_generation(lead_index, str(e), None, time.time() - start_time)
+                if on_complete is not None:
+                    on_complete(lead_index)
+                return
+            latency = time.time() - start_time
+        generation = store.record_generation(lead_index, result['email_draft'], result['recommended_product'], latency)
+
+    email_draft = generation['email_draft']
+    product = generation['product']
+
+    # 2. Jury Deliberation, only for jurists without a recorded verdict
+    # (a new draft invalidates every earlier verdict for this lead)
+    pending = [j for j in JURY_PANEL if regenerated or store.verdict(lead_index, j.name) is None]
+    if pending and jury_mode == "batched":
+        # One structured call scores every rubric
+        async with limiter:
+            verdicts = await BATCHED_JURY.aevaluate(email_draft, lead_profile, product)
+        for jurist, verdict in zip(JURY_PANEL, verdicts):
+            if jurist in pending:
+                store.record_verdict(lead_index, jurist.name, verdict)
+    elif pending:
+        # All jurists at once, each holding a slot of the shared limit; each verdict is saved as it lands
+        async def judge(jurist):
+            async with limiter:
+                verdict = await jurist.aevaluate(email_draft, lead_profile, product)
+            store.record_verdict(lead_index, jurist.name, verdict)
+
+        await asyncio.gather(*[judge(jurist) for jurist in pending])
 
+    if on_complete is not None:
+        on_complete(lead_index)
+
+async def _evaluate_leads(store: RunStore, concurrency, jury_mode="panel", on_complete=None):
+    limiter = asyncio.Semaphore(concurrency)
+    jurist_names = [j.name for j in JURY_PANEL]
+    todo = [i for i in range(len(store.leads)) if not store.is_lead_complete(i, jurist_names)]
+    tasks = [asyncio.ensure_future(_evaluate_lead(i, store.leads[i], limiter, store, jury_mode, on_complete))
+             for i in todo]
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Evaluating"):
+        await task
+
+def render_report(store: RunStore):
+    """
+    Builds the markdown report from whatever the run store holds, in sample order.
+    Returns (report_lines, stats); leads still missing a generation or verdict are left out.
+    """
     report_lines = []
     report_lines.append(f"# Evaluation Report\nDate: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
 
     grand_total_score = 0
     total_latency = 0
     total_evals = 0
+    lead_summaries = []
+
+    for i, lead in enumerate(store.leads):
+        generation = store.generations.get(i)
+        verdicts = [store.verdicts.get((i, jurist.name)) for jurist in JURY_PANEL]
+        if generation is None or any(v is None for v in verdicts):
+            continue
 
-    for i, lead in enumerate(high_value_leads):
-        print(f"\n{Fore.YELLOW}Processing Lead #{i+1} (Source: {lead.get('Lead Source')})...{Style.RESET_ALL}")
-        
-        # 1. Measure Latency & Generate
-        start_time = time.time()
-        
-        # Extract profile manually as we are bypassing the API layer
-        lead_profile = {
-            'Lead Source': lead.get('Lead Source'),
-            'Tags': lead.get('Tags'),
-            'Total Time Spent on Website': lead.get('Total Time Spent on Website', 0),
-            'Specialization': lead.get('Specialization', '')
-        }
-        
-        result = rag_service.run_rag_pipeline(lead_profile)
-        
-        end_time = time.time()
-        latency = end_time - start_time
+        latency = generation['latency']
         total_latency += latency
-        
-        email_draft = result['email_draft']
-        product = result['recommended_product']
-        
-        print(f"  -> Generated Email in {latency:.2f}s")
-        print(f"  -> Product Pitched: {product}")
-        
-        # 2. Jury Deliberation declaration
+
         report_lines.append(f"## Lead #{i+1}: {lead.get('Lead Source')}\n")
-        report_lines.append(f"**Recommended Product**: {product}\n")
+        report_lines.append(f"**Recommended Product**: {generation['product']}\n")
         report_lines.append(f"**Latency**: {latency:.2f}s\n")
-        report_lines.append(f"### Email Draft:\n```\n{email_draft}\n```\n")
+        report_lines.append(f"### Email Draft:\n```\n{generation['email_draft']}\n```\n")
         report_lines.append(f"### Jury Scores:\n")
-        
-        print(f"  -> {Fore.MAGENTA}Jury Deliberating...{Style.RESET_ALL}")
-        
+
         lead_scores = []
-        
-        for jurist in JURY_PANEL:
-            eval_result = jurist.evaluate(email_draft, lead_profile, product)
-            score = eval_result.get('score', 0)
-            reason = eval_result.get('reasoning', 'No reasoning provided')
-            
-            lead_scores.append(score)
-            
-            # Console Output
-            color = Fore.GREEN if score >= 8 else (Fore.YELLOW if score >= 5 else Fore.RED)
-            print(f"    - {jurist.name}: {color}{score}/10{Style.RESET_ALL} | {reason}")
-            
-            # Report Output
-            report_lines.append(f"- **{jurist.name}** ({score}/10): {reason}\n")
-            
+        for jurist, verdict in zip(JURY_PANEL, verdicts):
+            lead_scores.append(verdict['score'])
+            report_lines.append(f"- **{jurist.name}** ({verdict['score']}/10): {verdict['reasoning']}\n")
+
         avg_score = sum(lead_scores) / len(lead_scores)
         grand_total_score += avg_score
         total_evals += 1
-        
-        print(f"  -> {Fore.CYAN}Average Score: {avg_score:.1f}/10{Style.RESET_ALL}")
+        lead_summaries.append((i, lead, generation, verdicts, avg_score))
+
         report_lines.append(f"\n**Average Score**: {avg_score:.1f}/10\n\n---\n")
 
-    # Final Stats
-    avg_latency = total_latency / num_samples
+    avg_latency = total_latency / total_evals if total_evals > 0 else 0
     overall_avg_score = grand_total_score / total_evals if total_evals > 0 else 0
-    
-    print(f"\n{Fore.GREEN}======================================================={Style.RESET_ALL}")
-    print(f"EVALUATION COMPLETE")
-    print(f"Average Latency: {avg_latency:.2f}s")
-    print(f"Overall Quality Score: {overall_avg_score:.2f}/10")
-    print(f"Detailed Report saved to: evaluation_report.md")
-    
-    report_lines.insert(0, f"**Overall Quality Score**: {overall_avg_score:.2f}/10\n**Average Latency**: {avg_latency:.2f}s\n\n")
 
-    with open('evaluation_report.md', 'w', encoding='utf-8') as f:
+    header = f"**Overall Quality Score**: {overall_avg_score:.2f}/10\n**Average Latency**: {avg_latency:.2f}s\n"
+    if total_evals < len(store.leads):
+        header += f"**Status**: in progress ({total_evals}/{len(store.leads)} leads, run {store.run_id})\n"
+    report_lines.insert(0, header + "\n")
+
+    stats = {
+        "avg_latency": avg_latency,
+        "overall_avg_score": overall_avg_score,
+        "completed": total_evals,
+        "leads": lead_summaries
+    }
+    return report_lines, stats
+
+def write_report(store: RunStore, path=REPORT_PATH):
+    report_lines, stats = render_report(store)
+    # Write-then-rename so a crash never leaves a half-written report
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         f.writelines(report_lines)
+    os.replace(tmp_path, path)
+    return stats
+
+def run_evaluation(num_samples=5, concurrency=DEFAULT_CONCURRENCY, jury_mode="panel", resume_run_id=None):
+    print(f"{Fore.CYAN}=======================================================")
+    print(f"{Fore.CYAN}   Hybrid AI Sales Agent - Corporate Jury Evaluation   ")
+    print(f"{Fore.CYAN}======================================================={Style.RESET_ALL}")
+
+    if resume_run_id:
+        store = RunStore.open(resume_run_id)
+        # The original run's sample and jury mode win over the command line
+        num_samples = len(store.leads)
+        jury_mode = store.header.get('jury_mode', jury_mode)
+    else:
+        # Load Data directly
+        try:
+            # Shared columnar cache (backend/dataset.py) instead of re-parsing the CSV
+            df = load_dataset()
+            # Filter for high quality leads to make simulation realistic
+            high_value_leads = df[df['Converted'] == 1].sample(num_samples).to_dict(orient='records')
+        except Exception as e:
+            print(f"{Fore.RED}Error loading data: {e}")
+            return
+        store = RunStore.create(high_value_leads, jury_mode=jury_mode)
+
+    print(f"Running on recognized hardware (Ollama auto-detection).")
+    print(f"Jury Panel: {[j.name for j in JURY_PANEL]}")
+    print(f"Samples: {num_samples} Random Leads")
+    print(f"Jury Mode: {jury_mode} ({'1 call' if jury_mode == 'batched' else f'{len(JURY_PANEL)} calls'} per lead)")
+    print(f"Concurrency: {concurrency} LLM calls")
+    print(f"Run ID: {store.run_id} ({'resumed' if resume_run_id else 'new'}; resume with --resume {store.run_id})\n")
+
+    run_start = time.time()
+    # The report is re-rendered from the store each time a lead finishes
+    asyncio.run(_evaluate_leads(store, concurrency, jury_mode, on_complete=lambda i: write_report(store)))
+    wall_time = time.time() - run_start
+
+    stats = write_report(store)
+
+    for i, lead, generation, verdicts, avg_score in stats['leads']:
+        print(f"\n{Fore.YELLOW}Lead #{i+1} (Source: {lead.get('Lead Source')}){Style.RESET_ALL}")
+        print(f"  -> Generated Email in {generation['latency']:.2f}s")
+        print(f"  -> Product Pitched: {generation['product']}")
+        for jurist, verdict in zip(JURY_PANEL, verdicts):
+            score = verdict['score']
+            # Console Output
+            color = Fore.GREEN if score >= 8 else (Fore.YELLOW if score >= 5 else Fore.RED)
+            print(f"    - {jurist.name}: {color}{score}/10{Style.RESET_ALL} | {verdict['reasoning']}")
+        print(f"  -> {Fore.CYAN}Average Score: {avg_score:.1f}/10{Style.RESET_ALL}")
+
+    print(f"\n{Fore.GREEN}======================================================={Style.RESET_ALL}")
+    print(f"EVALUATION COMPLETE")
+    print(f"Wall Time: {wall_time:.2f}s")
+    print(f"Average Latency: {stats['avg_latency']:.2f}s")
+    print(f"Overall Quality Score: {stats['overall_avg_score']:.2f}/10")
+    # Measured from Ollama's response metadata for the calls this run made
+    for purpose in ('email', 'jury'):
+        measured = usage.summary(purpose, window='all')
+        if measured['calls']:
+            print(f"LLM usage ({purpose}): {measured['calls']} calls, {measured['prompt_tokens']} prompt + "
+                  f"{measured['completion_tokens']} completion tokens (${measured['token_cost']:.4f})")
+    print(f"Detailed Report saved to: {REPORT_PATH}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Corporate jury evaluation of generated emails")
+    parser.add_argument('--samples', type=int, default=5, help="Number of converted leads to evaluate")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Max LLM calls in flight")
+    parser.add_argument('--jury-mode', choices=['panel', 'batched'], default='panel',
+                        help="panel: one call per jurist; batched: all rubrics in one structured call")
+    parser.add_argument('--resume', metavar='RUN_ID', default=None,
+                        help="Resume a previous run, skipping generations and verdicts already recorded")
+    args = parser.parse_args()
+
     # Check for Ollama
     try:
         print("Checking Ollama connection...")
@@ -121,8 +223,9 @@ if __name__ == "__main__":
         test = ChatOllama(model="mistral").invoke("hello")
         print(f"{Fore.GREEN}Ollama Online.{Style.RESET_ALL}")
     except Exception as e:
-        print(f"{Fore.RED}CRITICAL: Ollama is not accessible. Please run 'ollama serve' in a separate terminal.{Style.RESET_ALL}") 
+        print(f"{Fore.RED}CRITICAL: Ollama is not accessible. Please run 'ollama serve' in a separate terminal.{Style.RESET_ALL}")
         print(str(e))
         sys.exit(1)
-        
-    run_evaluation()
+
+    run_evaluation(num_samples=args.samples, concurrency=args.concurrency, jury_mode=args.jury_mode,
+                   resume_run_id=args.resume)
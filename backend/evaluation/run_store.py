@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import uuid
+
+# Checkpoint store for evaluation runs.
+# Each run is one append-only JSONL file: a header record with the sampled leads, then one record per
+# finished generation and per jurist verdict. Re-opening a run replays the file, so a crashed or
+# interrupted run resumes without redoing any LLM work that already completed.
+
+RUNS_DIR = os.environ.get(
+    'EVAL_RUNS_DIR',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'artifacts', 'eval_runs'))
+)
+
+class RunStore:
+    def __init__(self, run_id, header, generations, verdicts, path):
+        self.run_id = run_id
+        self.header = header
+        self.generations = generations # lead_index -> generation record
+        self.verdicts = verdicts # (lead_index, jurist name) -> verdict record
+        self.path = path
+
+    @property
+    def leads(self):
+        return self.header['leads']
+
+    @staticmethod
+    def _path(run_id):
+        return os.path.join(RUNS_DIR, f"{run_id}.jsonl")
+
+    @classmethod
+    def create(cls, leads, **settings):
+        os.makedirs(RUNS_DIR, exist_ok=True)
+        run_id = time.strftime('%Y%m%d-%H%M%S') + '-' + uuid.uuid4().hex[:6]
+        header = {"type": "run", "run_id": run_id, "created_at": time.time(), "leads": leads, **settings}
+        store = cls(run_id, header, {}, {}, cls._path(run_id))
+        store._append(header)
+        return store
+
+    @classmethod
+    def open(cls, run_id):
+        path = cls._path(run_id)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No evaluation run {run_id} in {RUNS_DIR}")
+        header, generations, verdicts = None, {}, {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final line from a crash mid-write; everything before it is intact
+                    continue
+                if record['type'] == 'run':
+                    header = record
+                elif record['type'] == 'generation':
+                    generations[record['lead_index']] = record
+                elif record['type'] == 'verdict':
+                    verdicts[(record['lead_index'], record['jurist'])] = record
+        if header is None:
+            raise ValueError(f"Evaluation run {run_id} has no header record")
+        cls._terminate_torn_line(path)
+        return cls(run_id, header, generations, verdicts, path)
+
+    @staticmethod
+    def _terminate_torn_line(path):
+        # Start the next append on a fresh line, otherwise it would be glued to the torn record
+        with open(path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+    def _append(self, record):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # A failed generation or verdict is recorded for the report but redone on resume
+    def generation(self, lead_index):
+        record = self.generations.get(lead_index)
+        return record if record is not None and record['ok'] else None
+
+    def verdict(self, lead_index, jurist_name):
+        record = self.verdicts.get((lead_index, jurist_name))
+        return record if record is not None and record['ok'] else None
+
+    def record_generation(self, lead_index, email_draft, product, latency):
+        record = {
+            "type": "generation",
+            "lead_index": lead_index,
+            "email_draft": email_draft,
+            "product": product,
+            "latency": latency,
+            # Failed generations are recorded with the GenerationError text, which starts with "Error"
+            "ok": not str(email_draft).startswith("Error "),
+            "at": time.time()
+        }
+        self._append(record)
+        self.generations[lead_index] = record
+        return record
+
+    def record_verdict(self, lead_index, jurist_name, verdict: dict):
+        record = {
+            "type": "verdict",
+            "lead_index": lead_index,
+            "jurist": jurist_name,
+            "score": verdict.get('score', 0),
+            "reasoning": verdict.get('reasoning', 'No reasoning provided'),
+            "ok": not str(verdict.get('reasoning', '')).startswith("Evaluation Failed"),
+            "at": time.time()
+        }
+        self._append(record)
+        self.verdicts[(lead_index, jurist_name)] = record
+        return record
+
+    def is_lead_complete(self, lead_index, jurist_names):
+        return (self.generation(lead_index) is not None
+                and all(self.verdict(lead_index, name) is not None for name in jurist_names))
+
+def list_runs():
+    if not os.path.isdir(RUNS_DIR):
+        return []
+    return sorted(name[:-len('.jsonl')] for name in os.listdir(RUNS_DIR) if name.endswith('.jsonl'))
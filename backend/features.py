@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Single feature-engineering implementation shared by ml_service and the evaluation scripts.
+# Every step is a vectorised column operation; there is no per-row Python.
+
+# 1. High Intent Tags (Domain Knowledge)
+HIGH_INTENT_TAGS = ['Will revert after reading the email', 'Closed by Horizzon', 'Lost to EINS', 'Interested in other courses']
+
+# 2. Activity Score (Heuristic)
+ACTIVITY_SCORES = {
+    'SMS Sent': 10,
+    'Email Opened': 8,
+    'Page Visited on Website': 6,
+    'Olark Chat Conversation': 5,
+    'Converted to Lead': 4,
+    'Email Bounced': -2,
+    'Unreachable': -2
+}
+
+ENGINEERED_FEATURES = ['Has_High_Intent_Tag', 'Activity_Score', 'Time_Activity_Interaction']
+
+_HIGH_INTENT_SET = frozenset(HIGH_INTENT_TAGS)
+
+def _fill_unknown(series):
+    # Categoricals need the fill value registered as a category first
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if 'Unknown' not in series.cat.categories:
+            series = series.cat.add_categories('Unknown')
+    return series.fillna('Unknown')
+
+def _activity_score(last_activity):
+    if isinstance(last_activity.dtype, pd.CategoricalDtype):
+        # Score each category once, then gather by code
+        lookup = np.array([ACTIVITY_SCORES.get(c, 0) for c in last_activity.cat.categories] + [0], dtype=float)
+        return pd.Series(lookup[last_activity.cat.codes.to_numpy()], index=last_activity.index)
+    return last_activity.map(ACTIVITY_SCORES).fillna(0).astype(float)
+
+def engineer_features(df, inplace=False):
+    """
+    Adds Has_High_Intent_Tag, Activity_Score and Time_Activity_Interaction.
+    Missing Tags / Last Activity become 'Unknown' and Total Time is coerced to numeric (NaN -> 0).
+    Works on object or categorical columns. Unless inplace=True, the caller's frame is left
+    untouched via a shallow copy, so no column data is duplicated.
+    """
+    if not inplace:
+        df = df.copy(deep=False)
+
+    df['Tags'] = _fill_unknown(df['Tags'])
+    df['Has_High_Intent_Tag'] = df['Tags'].isin(HIGH_INTENT_TAGS).astype(np.int64)
+
+    df['Last Activity'] = _fill_unknown(df['Last Activity'])
+    df['Activity_Score'] = _activity_score(df['Last Activity'])
+
+    # 3. Interaction: Time * Activity Score
+    df['Total Time Spent on Website'] = pd.to_numeric(df['Total Time Spent on Website'], errors='coerce').fillna(0)
+    df['Time_Activity_Interaction'] = df['Total Time Spent on Website'] * df['Activity_Score']
+
+    return df
+
+def engineer_record(lead_data: dict) -> dict:
+    """
+    Single-lead mode: the same features as engineer_features, computed on a plain dict.
+    Avoids pandas' fixed per-call overhead on the one-row scoring path.
+    """
+    record = dict(lead_data)
+
+    tags = record.get('Tags')
+    if tags is None or (isinstance(tags, float) and np.isnan(tags)):
+        tags = 'Unknown'
+    record['Tags'] = tags
+
+    activity = record.get('Last Activity')
+    if activity is None or (isinstance(activity, float) and np.isnan(activity)):
+        activity = 'Unknown'
+    record['Last Activity'] = activity
+
+    try:
+        time_on_site = float(record.get('Total Time Spent on Website'))
+    except (TypeError, ValueError):
+        time_on_site = 0.0
+    if np.isnan(time_on_site):
+        time_on_site = 0.0
+    record['Total Time Spent on Website'] = time_on_site
+
+    activity_score = float(ACTIVITY_SCORES.get(activity, 0))
+    record['Has_High_Intent_Tag'] = 1 if tags in _HIGH_INTENT_SET else 0
+    record['Activity_Score'] = activity_score
+    record['Time_Activity_Interaction'] = time_on_site * activity_score
+    return record
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# Gains / lift engine for the capture-rate metric, shared by training (tuning.py) and the evaluation scripts.
+# "Top N% capture" = share of all conversions found in the N% highest-scored leads.
+# Predictions are argsorted once; every cutoff on the grid is then a lookup into one cumulative sum.
+# Bootstrap resamples are expressed as per-lead draw counts over that same sorted order, so no
+# resample is ever re-sorted.
+
+DEFAULT_PERCENTILES = (1, 5, 10, 20)
+
+def _rank(y_true, scores):
+    """Labels ordered by descending score (stable, so ties keep their input order)."""
+    y_true = np.asarray(y_true, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    if y_true.shape != scores.shape or y_true.ndim != 1:
+        raise ValueError("y_true and scores must be 1-D arrays of the same length")
+    order = np.argsort(-scores, kind='stable')
+    return y_true[order]
+
+def _cutoffs(n, percentiles):
+    # Same rounding as the original head(int(n * p / 100))
+    return (n * np.asarray(percentiles, dtype=np.float64) / 100).astype(np.int64)
+
+def capture_rates(y_true, scores, percentiles=DEFAULT_PERCENTILES):
+    """Capture rate at each percentile cutoff, as an array aligned with `percentiles`."""
+    y_sorted = _rank(y_true, scores)
+    cum = np.concatenate(([0.0], np.cumsum(y_sorted)))
+    total = cum[-1]
+    if total <= 0:
+        return np.zeros(len(percentiles))
+    return cum[_cutoffs(len(y_sorted), percentiles)] / total
+
+def gains_table(y_true, scores, percentiles=DEFAULT_PERCENTILES):
+    """
+    Cumulative gains and lift per cutoff.
+    lift = capture rate / share of leads contacted (1.0 = no better than random).
+    """
+    y_sorted = _rank(y_true, scores)
+    n = len(y_sorted)
+    cum = np.concatenate(([0.0], np.cumsum(y_sorted)))
+    total = cum[-1]
+    k = _cutoffs(n, percentiles)
+    captured = cum[k]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        capture = captured / total if total > 0 else np.zeros(len(k))
+        precision = np.where(k > 0, captured / np.maximum(k, 1), 0.0)
+        lift = np.where(k > 0, capture / (k / n), np.nan)
+    return pd.DataFrame({
+        "Percentile": np.asarray(percentiles),
+        "Leads": k,
+        "Captured": captured.astype(np.int64),
+        "Capture Rate": capture,
+        "Precision": precision,
+        "Lift": lift
+    })
+
+def bootstrap_capture(y_true, scores, percentiles=DEFAULT_PERCENTILES, n_boot=1000, alpha=0.05,
+                      random_state=None, max_cells=2 ** 24):
+    """
+    Percentile-bootstrap confidence intervals for the capture rates.
+
+    Each resample is a vector of draw counts over the score-sorted leads, so its ranking is
+    the original ranking with duplicates kept adjacent. The top-k of a resample is found with one
+    searchsorted over the cumulative counts. Resamples are processed in chunks of at most
+    `max_cells` (resamples x leads) to bound memory.
+    """
+    y_sorted = _rank(y_true, scores)
+    n = len(y_sorted)
+    k = _cutoffs(n, percentiles)
+    rng = np.random.default_rng(random_state)
+    chunk = max(1, min(n_boot, max_cells // max(n, 1)))
+
+    samples = np.empty((n_boot, len(k)))
+    for start in range(0, n_boot, chunk):
+        b = min(chunk, n_boot - start)
+        # Draw counts per lead for b resamples in one bincount (much faster than rng.multinomial)
+        draws = rng.integers(0, n, size=(b, n)) + np.arange(b)[:, None] * n
+        weights = np.bincount(draws.ravel(), minlength=b * n).reshape(b, n).astype(np.float64)
+        cum_w = np.cumsum(weights, axis=1)
+        cum_y = np.cumsum(weights * y_sorted, axis=1)
+
+        # First position whose cumulative count reaches k, for every (resample, cutoff) at once:
+        # offset each row so the flattened array stays sorted and one searchsorted covers all rows
+        offsets = np.arange(b)[:, None] * (n + 1.0)
+        pos = np.searchsorted((cum_w + offsets).ravel(), (k[None, :] + offsets).ravel())
+        rows = np.repeat(np.arange(b), len(k))
+        cols = np.minimum(pos - rows * n, n - 1)
+
+        # Everything up to that position, minus the copies of it that fall past the cutoff
+        overshoot = cum_w[rows, cols] - np.tile(k, b)
+        captured = cum_y[rows, cols] - overshoot * y_sorted[cols]
+        captured = np.where(np.tile(k, b) > 0, captured, 0.0).reshape(b, len(k))
+        total = cum_y[:, -1:]
+        samples[start:start + b] = np.divide(captured, total, out=np.zeros_like(captured), where=total > 0)
+
+    low, high = np.quantile(samples, [alpha / 2, 1 - alpha / 2], axis=0)
+    return pd.DataFrame({
+        "Percentile": np.asarray(percentiles),
+        "Capture Rate": capture_rates(y_true, scores, percentiles),
+        "Std": samples.std(axis=0, ddof=1) if n_boot > 1 else np.zeros(len(k)),
+        "CI Low": low,
+        "CI High": high
+    })
@@ -0,0 +1,114 @@
+import math
+import json
+import numpy as np
+import lightgbm as lgb
+from backend.features import engineer_record
+
+# Compiled single-lead scorer.
+# A fitted scoring pipeline (ColumnTransformer + LGBMClassifier) is flattened into plain lookup tables:
+# numeric column -> (slot, median) and categorical value -> slot (one-hot) or code (native). Scoring a
+# lead fills one NumPy vector and calls the booster's raw predict, with no pandas or sklearn in the path.
+# The exported JSON only needs numpy + lightgbm to load, so webhook workers can score without the API stack.
+
+SCORER_FILENAME = 'scorer.json'
+FORMAT_VERSION = 1
+
+class LeanScorer:
+    def __init__(self, booster, preprocessing, numeric, categorical, n_features):
+        self.booster = booster
+        self.preprocessing = preprocessing
+        # [(feature, slot, fill value)] for the median-imputed numeric columns
+        self.numeric = numeric
+        # [(feature, base slot, {value: slot or code})]; base slot is the code column in native mode
+        self.categorical = categorical
+        self.n_features = n_features
+
+    @classmethod
+    def compile(cls, pipeline, preprocessing='onehot'):
+        """Builds the lookup tables from a fitted ml_service scoring pipeline."""
+        preprocessor = pipeline.named_steps['preprocessor']
+        booster = pipeline.named_steps['classifier'].booster_
+        numeric, categorical = [], []
+        slot = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if name == 'num':
+                for column, median in zip(columns, transformer.statistics_):
+                    numeric.append((column, slot, float(median)))
+                    slot += 1
+            elif name == 'cat' and preprocessing == 'native':
+                for column, categories in zip(columns, transformer.categories_):
+                    categorical.append((column, slot, {str(v): i for i, v in enumerate(categories)}))
+                    slot += 1
+            elif name == 'cat':
+                onehot = transformer.named_steps['onehot']
+                for column, categories in zip(columns, onehot.categories_):
+                    categorical.append((column, slot, {str(v): slot + i for i, v in enumerate(categories)}))
+                    slot += len(categories)
+        if slot != booster.num_feature():
+            raise ValueError(f"Compiled {slot} features but the booster expects {booster.num_feature()}")
+        return cls(booster, preprocessing, numeric, categorical, slot)
+
+    def vector(self, lead_data: dict):
+        """The (1, n_features) model input for one raw lead dict, identical to the pipeline's transform."""
+        record = engineer_record(lead_data)
+        x = np.zeros((1, self.n_features))
+        row = x[0]
+        for column, slot, fill in self.numeric:
+            value = record.get(column)
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = math.nan
+            row[slot] = fill if math.isnan(value) else value
+        native = self.preprocessing == 'native'
+        for column, slot, lookup in self.categorical:
+            value = record.get(column)
+            if native:
+                # Missing/unseen -> -1, as CategoryCodeEncoder does
+                row[slot] = -1.0 if _is_missing(value) else lookup.get(str(value), -1)
+            else:
+                # SimpleImputer fills NaN with 'Unknown' (on object columns it leaves None alone, so None is
+                # just an unseen value); unseen values set no column (handle_unknown='ignore')
+                is_nan = isinstance(value, float) and math.isnan(value)
+                index = lookup.get('Unknown' if is_nan else str(value)) if value is not None else None
+                if index is not None:
+                    row[index] = 1.0
+        return x
+
+    def predict_raw(self, lead_data: dict) -> float:
+        return float(self.booster.predict(self.vector(lead_data), raw_score=True)[0])
+
+    def predict_proba(self, lead_data: dict) -> float:
+        """Conversion probability (binary logloss objective: sigmoid of the raw score)."""
+        return 1.0 / (1.0 + math.exp(-self.predict_raw(lead_data)))
+
+    def dumps(self) -> str:
+        return json.dumps({
+            "format": FORMAT_VERSION,
+            "preprocessing": self.preprocessing,
+            "numeric": self.numeric,
+            "categorical": self.categorical,
+            "n_features": self.n_features,
+            "booster": self.booster.model_to_string()
+        })
+
+    @classmethod
+    def loads(cls, text: str):
+        data = json.loads(text)
+        if data.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported scorer format {data.get('format')}")
+        return cls(
+            lgb.Booster(model_str=data["booster"]),
+            data["preprocessing"],
+            [tuple(n) for n in data["numeric"]],
+            [tuple(c) for c in data["categorical"]],
+            data["n_features"]
+        )
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.loads(f.read())
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
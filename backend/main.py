@@ -1,10 +1,30 @@
-from fastapi import FastAPI, HTTPException
+import json
+import anyio
+from typing import List, Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Header
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from backend.models import TrainResponse, EmailGenerationRequest, EmailGenerationResponse
+from backend.models import TrainRequest, TrainResponse, EmailGenerationRequest, EmailGenerationResponse, CampaignRequest, CampaignStatus, TrainJobStatus
 import backend.ml_service as ml_service
 import backend.rag_service as rag_service
+import backend.campaign_service as campaign_service
+import backend.training_jobs as training_jobs
+from backend import metrics, usage
 
-app = FastAPI(title="Hybrid AI Sales Agent API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm startup: load the persisted model once per process instead of training on the first request
+    await run_in_threadpool(ml_service.ensure_model_loaded)
+    await run_in_threadpool(rag_service.warm_catalog_index)
+    # Token usage of every API process lands in one ledger, so /api/roi covers all of them
+    usage.attach_shared_store()
+    yield
+    training_jobs.shutdown()
+    await run_in_threadpool(usage.ledger.flush)
+
+app = FastAPI(title="Hybrid AI Sales Agent API", lifespan=lifespan)
 
 # Setup CORS for React Frontend (Port 5173 usually)
 origins = [
@@ -21,65 +41,264 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(metrics.MetricsMiddleware)
+
+_threadpool_busy = metrics.gauge('threadpool_busy_threads', 'Sync endpoint / run_in_threadpool calls holding a thread')
+_threadpool_waiting = metrics.gauge('threadpool_waiting_tasks', 'Calls queued for a free threadpool thread')
+
 @app.get("/")
 def read_root():
     return {"message": "Western Digital AI Sales Agent Backend is Running"}
 
+def _train_call(request: TrainRequest):
+    """(incremental, kwargs) for ml_service.incremental_train or ml_service.train_model."""
+    if request.incremental:
+        return True, {
+            "rounds": request.incremental_rounds or ml_service.INCREMENTAL_ROUNDS,
+            "full_retrain_every": request.full_retrain_every or ml_service.FULL_RETRAIN_EVERY,
+            "drift_tolerance": (request.drift_tolerance if request.drift_tolerance is not None
+                                else ml_service.DRIFT_TOLERANCE),
+            "random_state": request.random_state
+        }
+    preprocessing = request.preprocessing or ml_service.DEFAULT_PREPROCESSING
+    if preprocessing not in ml_service.PREPROCESSING_MODES:
+        raise HTTPException(status_code=422, detail=f"Unknown preprocessing mode {preprocessing!r}")
+    return False, {
+        "test_size": request.test_size,
+        "random_state": request.random_state,
+        "tune": request.tune,
+        "use_best_params": request.use_best_params,
+        "preprocessing": preprocessing,
+        "tuning_options": {
+            "n_candidates": request.n_candidates,
+            "min_rounds": request.min_rounds,
+            "max_rounds": request.max_rounds,
+            "eta": request.eta,
+            "early_stopping_rounds": request.early_stopping_rounds,
+            "validation_size": request.validation_size,
+            "time_budget": request.time_budget_seconds,
+            "n_jobs": request.n_jobs
+        }
+    }
+
+def _train_message(results):
+    mode = results.get('training_mode', 'full')
+    if mode == "incremental":
+        return f"Model updated with {results['new_rows']} new rows"
+    if mode == "none":
+        return "Model is up to date, no new rows"
+    if results.get('full_retrain_reason'):
+        return f"Full retrain: {results['full_retrain_reason']}"
+    return "Model tuned and trained successfully" if results.get('tuning') else "Model trained successfully"
+
 @app.post("/api/train", response_model=TrainResponse)
-def train_model_endpoint():
+def train_model_endpoint(request: Optional[TrainRequest] = None):
+    # Synchronous: holds this worker for the whole fit. Prefer POST /api/train/jobs for production-sized data.
+    incremental, kwargs = _train_call(request or TrainRequest())
     try:
-        results = ml_service.train_model()
+        if incremental:
+            results = ml_service.incremental_train(**kwargs)
+        else:
+            results = ml_service.train_model(**kwargs)
         return TrainResponse(
             accuracy=results['accuracy'],
             feature_importance=results['feature_importance'],
-            message="Model trained successfully"
+            message=_train_message(results),
+            version=results['version'],
+            params=results['params'],
+            tuning=results.get('tuning'),
+            training_mode=results.get('training_mode', 'full'),
+            new_rows=results.get('new_rows')
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/train/jobs", response_model=TrainJobStatus, status_code=202)
+async def create_train_job_endpoint(request: Optional[TrainRequest] = None):
+    # Training runs in a separate process; poll GET /api/train/jobs/{job_id} for status and metrics
+    incremental, kwargs = _train_call(request or TrainRequest())
+    return training_jobs.start_job(incremental, kwargs).summary()
+
+@app.get("/api/train/jobs", response_model=List[TrainJobStatus])
+def list_train_jobs_endpoint():
+    return [job.summary() for job in training_jobs.list_jobs()]
+
+@app.get("/api/train/jobs/{job_id}", response_model=TrainJobStatus)
+def get_train_job_endpoint(job_id: str):
+    try:
+        return training_jobs.get_job(job_id).summary()
+    except training_jobs.TrainingJobNotFoundError:
+        raise HTTPException(status_code=404, detail="Training job not found")
+
 @app.get("/api/leads")
-def get_leads_endpoint():
+def get_leads_endpoint(limit: Optional[int] = Query(None, ge=1)):
     try:
-        leads = ml_service.get_leads_data()
+        # Scores the full lead table in one batch; `limit` returns a random subset instead
+        leads = ml_service.get_leads_data(limit=limit)
         return leads
+    except ml_service.ModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/leads/top")
+def get_top_leads_endpoint(
+    k: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    origin: Optional[List[str]] = Query(None),
+    source: Optional[List[str]] = Query(None)
+):
+    try:
+        # Served from the score index precomputed after training; repeat origin/source to OR values
+        return ml_service.get_top_leads(k=k, offset=offset, origins=origin, sources=source)
+    except ml_service.ModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/model")
+def get_model_info_endpoint():
+    if ml_service.current_model_metadata is None:
+        raise HTTPException(status_code=503, detail="No trained model is loaded")
+    return ml_service.current_model_metadata
+
 @app.post("/api/generate-email", response_model=EmailGenerationResponse)
-def generate_email_endpoint(request: EmailGenerationRequest):
+async def generate_email_endpoint(request: EmailGenerationRequest):
     try:
         # Convert Pydantic model to dict
         lead_profile = request.lead_profile.dict()
         
-        # Run RAG
-        result = rag_service.run_rag_pipeline(lead_profile)
+        # Run RAG on the event loop; concurrency is bounded inside rag_service, not by the threadpool
+        result = await rag_service.arun_rag_pipeline(lead_profile, use_cache=request.use_cache)
         
         return EmailGenerationResponse(
             email_content=result['email_draft'],
-            product_recommended=result['recommended_product']
+            product_recommended=result['recommended_product'],
+            generation_tier=result.get('generation_tier')
         )
+    except rag_service.GenerationError as e:
+        # Ollama unreachable or the model missing
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/generate-email/stream")
+async def stream_email_endpoint(request: EmailGenerationRequest):
+    # Server-Sent Events: `product` first (retrieval only), `tier` (model or "template"), then `token` events, then `done`
+    lead_profile = request.lead_profile.dict()
+
+    async def events():
+        # The model the request was routed to, so an error names the tier that actually failed
+        tier = None
+        try:
+            async for kind, data in rag_service.astream_rag_pipeline(lead_profile, use_cache=request.use_cache):
+                if kind == "tier":
+                    tier = data
+                yield f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            message = f"Error generation email: {str(e)}."
+            if tier is not None and tier != rag_service.TEMPLATE_TIER.name:
+                message += f" Is the '{tier}' model pulled? Run 'ollama pull {tier}'."
+            yield f"event: error\ndata: {json.dumps(message)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/campaigns", response_model=CampaignStatus)
+async def create_campaign_endpoint(request: CampaignRequest):
+    if not request.lead_ids and request.min_score is None:
+        raise HTTPException(status_code=422, detail="Provide lead_ids or min_score")
+    try:
+        leads = await run_in_threadpool(
+            campaign_service.select_leads, request.lead_ids, request.min_score, request.limit
+        )
+    except ml_service.ModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    campaign = campaign_service.start_campaign(leads, workers=request.workers, use_cache=request.use_cache)
+    return campaign.summary()
+
+@app.get("/api/campaigns/{campaign_id}")
+def get_campaign_endpoint(campaign_id: str, cursor: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    # Polling: pass next_cursor back as cursor to resume where the last page ended
+    try:
+        return campaign_service.get_results(campaign_id, cursor=cursor, limit=limit)
+    except campaign_service.CampaignNotFoundError:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+@app.get("/api/campaigns/{campaign_id}/events")
+def stream_campaign_endpoint(campaign_id: str, cursor: int = Query(0, ge=0), last_event_id: Optional[str] = Header(None)):
+    # Server-Sent Events; each event id is the result's sequence number, so reconnects resume via Last-Event-ID
+    try:
+        campaign = campaign_service.get_campaign(campaign_id)
+    except campaign_service.CampaignNotFoundError:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    if last_event_id is not None and last_event_id.isdigit():
+        cursor = int(last_event_id) + 1
+
+    async def events():
+        async for result in campaign_service.stream_results(campaign_id, cursor=cursor):
+            if result is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {result['seq']}\nevent: result\ndata: {json.dumps(result)}\n\n"
+        yield f"event: done\ndata: {json.dumps(campaign.summary())}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.post("/api/campaigns/{campaign_id}/cancel", response_model=CampaignStatus)
+def cancel_campaign_endpoint(campaign_id: str):
+    try:
+        return campaign_service.cancel_campaign(campaign_id).summary()
+    except campaign_service.CampaignNotFoundError:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+@app.get("/api/cache/stats")
+def email_cache_stats_endpoint():
+    return rag_service.email_cache.summary()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    # Prometheus text format; per process, so under backend/serve.py each worker reports its own view.
+    # Async so it is answered on the event loop even when the threadpool is saturated.
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    _threadpool_busy.set(limiter.borrowed_tokens)
+    _threadpool_waiting.set(limiter.statistics().tasks_waiting)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Human SDR baseline: 15 mins per email at $25/hr
+HUMAN_COST_PER_EMAIL = 6.25
+# Token counts assumed before any email has been measured in the window
+ASSUMED_PROMPT_TOKENS = 500
+ASSUMED_COMPLETION_TOKENS = 200
+
 @app.get("/api/roi")
-def calculate_roi_endpoint():
-    # ROI Logic as per requirements
-    # Input tokens = 500, Output tokens = 200. Price = $0.002/1k tokens.
-    
-    input_tokens = 500
-    output_tokens = 200
-    price_per_1k = 0.002
+def calculate_roi_endpoint(window: str = Query('24h', description=f"One of {list(usage.WINDOWS)}")):
+    # Cost per email from measured token counts (Ollama prompt_eval_count / eval_count) over the window.
+    # Emails served from the cache count as delivered, so the cache lowers the measured cost per email.
+    if window not in usage.WINDOWS:
+        raise HTTPException(status_code=422, detail=f"Unknown window {window!r}; expected one of {list(usage.WINDOWS)}")
+    measured = usage.summary('email', window)
     
-    cost_per_email = ((input_tokens + output_tokens) / 1000) * price_per_1k
+    if measured['emails']:
+        source = "measured"
+        cost_per_email = measured['token_cost'] / measured['emails']
+    else:
+        source = "assumed"
+        cost_per_email = usage.token_cost(ASSUMED_PROMPT_TOKENS, ASSUMED_COMPLETION_TOKENS)
     
-    # Assuming human SDR takes 15 mins ($25/hr rate -> $6.25 per email)
-    human_cost = 6.25
-    savings_per_email = human_cost - cost_per_email
+    savings_per_email = HUMAN_COST_PER_EMAIL - cost_per_email
     
     return {
         "cost_per_email_ai": f"${cost_per_email:.5f}",
-        "human_cost_baseline": f"${human_cost:.2f}",
-        "savings_per_thousand_emails": f"${savings_per_email * 1000:.2f}"
+        "human_cost_baseline": f"${HUMAN_COST_PER_EMAIL:.2f}",
+        "savings_per_thousand_emails": f"${savings_per_email * 1000:.2f}",
+        "source": source,
+        "window": window,
+        "price_per_1k_prompt_tokens": usage.PRICE_PER_1K_PROMPT,
+        "price_per_1k_completion_tokens": usage.PRICE_PER_1K_COMPLETION,
+        "generation": measured,
+        # Jury calls in the shared ledger; the offline evaluation scripts keep their usage in-process
+        "evaluation": usage.summary('jury', window)
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,230 @@
+import time
+import math
+import threading
+from contextlib import contextmanager
+
+# In-process metrics in the Prometheus text exposition format, served by GET /metrics.
+# Counters, gauges and histograms with labels; no client library needed. Gauges that mirror other
+# components' state (queue depths, cache stats) are filled by collector callbacks at scrape time.
+# Values are per process: under backend/serve.py, --metrics-port gives every worker its own scrape port.
+
+# Seconds; covers sub-millisecond scoring up to minute-long LLM generations
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+
+_lock = threading.Lock()
+_metrics = {} # name -> metric, in registration order
+_collectors = []
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1.0, **labels):
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value, **labels):
+        # For totals another component already counts (e.g. cache stats), mirrored by a collector
+        with _lock:
+            self._values[_label_key(labels)] = value
+
+    def render(self):
+        lines = self._header()
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount=1.0, **labels):
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        lines = self._header()
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["counts"][i] += 1
+                    break
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def render(self):
+        lines = self._header()
+        for key, entry in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["counts"]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {entry['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(entry['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {entry['count']}")
+        return lines
+
+def _register(metric):
+    with _lock:
+        existing = _metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        _metrics[metric.name] = metric
+        return metric
+
+def counter(name, help_text):
+    return _register(Counter(name, help_text))
+
+def gauge(name, help_text):
+    return _register(Gauge(name, help_text))
+
+def histogram(name, help_text, buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, help_text, buckets))
+
+def register_collector(fn):
+    """fn() is called before each scrape to refresh mirrored gauges; errors are ignored."""
+    _collectors.append(fn)
+    return fn
+
+def render():
+    for fn in list(_collectors):
+        try:
+            fn()
+        except Exception:
+            pass
+    with _lock:
+        lines = []
+        for metric in _metrics.values():
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Shared instruments
+
+HTTP_REQUEST_SECONDS = histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template, until the last body byte'
+)
+HTTP_REQUESTS_IN_FLIGHT = gauge('http_requests_in_flight', 'HTTP requests currently being handled')
+STAGE_SECONDS = histogram('stage_duration_seconds', 'Duration of internal pipeline stages')
+
+LLM_TTFT_SECONDS = histogram('llm_time_to_first_token_seconds', 'Time from sending the prompt to the first token')
+LLM_GENERATION_SECONDS = histogram('llm_generation_seconds', 'Total LLM generation time per email')
+LLM_TOKENS_PER_SECOND = histogram('llm_tokens_per_second', 'Streamed output chunks per second after the first token',
+                                  buckets=RATE_BUCKETS)
+LLM_OUTPUT_CHUNKS = counter('llm_output_chunks_total', 'Streamed output chunks (about one token each with Ollama)')
+LLM_QUEUE_WAIT_SECONDS = histogram('llm_queue_wait_seconds', 'Time spent waiting for an LLM concurrency slot')
+
+@contextmanager
+def timer(stage):
+    """Times the block into stage_duration_seconds{stage=...}, including when it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+class StreamTimer:
+    """Per-generation LLM timings: call token() for each streamed chunk, then finish()."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token_at = None
+        self.chunks = 0
+
+    def token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            LLM_TTFT_SECONDS.observe(self.first_token_at - self.start)
+        self.chunks += 1
+
+    def finish(self):
+        end = time.perf_counter()
+        LLM_GENERATION_SECONDS.observe(end - self.start)
+        LLM_OUTPUT_CHUNKS.inc(self.chunks)
+        if self.first_token_at is not None and self.chunks > 1 and end > self.first_token_at:
+            LLM_TOKENS_PER_SECOND.observe((self.chunks - 1) / (end - self.first_token_at))
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording http_request_duration_seconds{method, route, status}.
+    Labelled by the matched route template (/api/campaigns/{campaign_id}), not the raw path, to bound cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status[0]
+            )
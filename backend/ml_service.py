@@ -1,66 +1,197 @@
 import pandas as pd
+import numpy as np
+import time
 import os
+import logging
+import threading
 from sklearn.model_selection import train_test_split
 from lightgbm import LGBMClassifier
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
-from sklearn.metrics import accuracy_score
-import joblib
+from sklearn.metrics import accuracy_score, roc_auc_score
+from backend import model_store, tuning, metrics
+from backend.dataset import DATA_PATH, load_dataset, dataset_fingerprint
+from backend.features import engineer_features, engineer_record, ENGINEERED_FEATURES
+from backend.score_index import ScoreIndex, rank_order
+from backend.lean_scorer import LeanScorer, SCORER_FILENAME
 
-# Global variable to store the model
+logger = logging.getLogger(__name__)
+
+# Global variable to store the model.
+# Only ever replaced wholesale (never mutated), so readers that grab the reference once are safe during a swap.
 current_model = None
+current_model_metadata = None
+
+# Compiled single-lead scorer for current_model (see lean_scorer.py); None if compilation failed
+current_scorer = None
+
+# Ranking of the full lead base under current_model, rebuilt whenever the model changes
+current_score_index = None
+
+# Serialises persist+swap so the in-memory model always matches the store's LATEST version
+_swap_lock = threading.Lock()
+
+class ModelNotReadyError(RuntimeError):
+    pass
+
+# Stable row identity in the CRM export, used to find rows a model has not seen yet
+ID_COLUMN = 'Prospect ID'
+
+# Incremental retraining: boosting rounds added per delta, and the drift guards that force a full retrain
+INCREMENTAL_ROUNDS = int(os.environ.get('INCREMENTAL_ROUNDS', '50'))
+FULL_RETRAIN_EVERY = int(os.environ.get('FULL_RETRAIN_EVERY', '7'))
+DRIFT_TOLERANCE = float(os.environ.get('DRIFT_TOLERANCE', '0.05'))
+# A delta this large relative to what the model has seen is cheaper to learn from scratch
+MAX_DELTA_FRACTION = 0.5
 
-# Path to data - adjusting for backend/ location
-DATA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/archive/Lead Scoring.csv'))
+# Raw columns the scoring pipeline reads (before feature engineering)
+MODEL_INPUT_COLUMNS = ['Lead Origin', 'Lead Source', 'Total Time Spent on Website', 'Last Activity', 'Tags']
 
 def load_data():
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"Dataset not found at {DATA_PATH}")
-    return pd.read_csv(DATA_PATH)
-
-def engineer_features(df):
-    df = df.copy()
-    
-    # 1. High Intent Tags (Domain Knowledge)
-    high_intent_tags = ['Will revert after reading the email', 'Closed by Horizzon', 'Lost to EINS', 'Interested in other courses']
-    # Handle NaN for Tags safely
-    df['Tags'] = df['Tags'].fillna('Unknown')
-    df['Has_High_Intent_Tag'] = df['Tags'].apply(lambda x: 1 if x in high_intent_tags else 0)
-    
-    # 2. Activity Score (Heuristic)
-    activity_scores = {
-        'SMS Sent': 10,
-        'Email Opened': 8,
-        'Page Visited on Website': 6,
-        'Olark Chat Conversation': 5,
-        'Converted to Lead': 4,
-        'Email Bounced': -2,
-        'Unreachable': -2
-    }
-    # Handle NaN for Last Activity safely
-    df['Last Activity'] = df['Last Activity'].fillna('Unknown')
-    df['Activity_Score'] = df['Last Activity'].map(activity_scores).fillna(0)
+    # Served from the shared columnar cache; the CSV is only parsed when it changes
+    with metrics.timer('load_data'):
+        return load_dataset(DATA_PATH)
+
+# Columns as the preprocessing pipeline sees them, after feature engineering
+NUMERIC_FEATURES = ['Total Time Spent on Website'] + ENGINEERED_FEATURES
+CATEGORICAL_FEATURES = ['Lead Origin', 'Lead Source', 'Last Activity', 'Tags']
+
+# How categoricals reach LightGBM:
+#   onehot - sparse one-hot expansion (the original pipeline)
+#   native - one ordinal code column per feature, split on natively by LightGBM; no wide matrices
+PREPROCESSING_MODES = ('onehot', 'native')
+DEFAULT_PREPROCESSING = os.environ.get('PREPROCESSING_MODE', 'onehot')
+
+class CategoryCodeEncoder(BaseEstimator, TransformerMixin):
+    """
+    Encodes each categorical column as the integer code of its value among the categories seen in fit.
+    Missing and unseen values become -1, which LightGBM's native categorical splits treat as missing.
+    Hash lookups via pandas, so no object-array imputation or sorting pass over the full column.
+    """
+    def fit(self, X, y=None):
+        X = pd.DataFrame(X)
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.categories_ = [pd.Index(X[col].dropna().astype(object).unique()) for col in X.columns]
+        return self
+    
+    def transform(self, X):
+        X = pd.DataFrame(X)
+        codes = np.empty((len(X), len(self.categories_)), dtype=np.float32)
+        for j, (col, categories) in enumerate(zip(X.columns, self.categories_)):
+            codes[:, j] = categories.get_indexer(X[col].astype(object))
+        return codes
+    
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_names_in_ if input_features is None else input_features, dtype=object)
+
+def build_preprocessor(mode=DEFAULT_PREPROCESSING):
+    if mode not in PREPROCESSING_MODES:
+        raise ValueError(f"Unknown preprocessing mode {mode!r}; expected one of {PREPROCESSING_MODES}")
+    numeric_transformer = SimpleImputer(strategy='median')
     
-    # 3. Interaction: Time * Activity Score
-    # Ensure Total Time is numeric
-    df['Total Time Spent on Website'] = pd.to_numeric(df['Total Time Spent on Website'], errors='coerce').fillna(0)
-    df['Time_Activity_Interaction'] = df['Total Time Spent on Website'] * df['Activity_Score']
+    if mode == 'native':
+        categorical_transformer = CategoryCodeEncoder()
+    else:
+        categorical_transformer = Pipeline(steps=[
+            ('imputer', SimpleImputer(strategy='constant', fill_value='Unknown')),
+            ('onehot', OneHotEncoder(handle_unknown='ignore'))
+        ])
     
-    return df
+    return ColumnTransformer(
+        transformers=[
+            ('num', numeric_transformer, NUMERIC_FEATURES),
+            ('cat', categorical_transformer, CATEGORICAL_FEATURES)
+        ])
+
+def categorical_fit_params(mode, step=None):
+    """fit() kwargs telling LightGBM which transformed columns are categorical (numerics come first)."""
+    if mode != 'native':
+        return {}
+    start = len(NUMERIC_FEATURES)
+    key = f"{step}__categorical_feature" if step else 'categorical_feature'
+    return {key: list(range(start, start + len(CATEGORICAL_FEATURES)))}
+
+def transformed_feature_names(preprocessor, mode):
+    """Column names of the preprocessor output, used to label feature importances."""
+    if mode == 'native':
+        return NUMERIC_FEATURES + CATEGORICAL_FEATURES
+    onehot = preprocessor.named_transformers_['cat'].named_steps['onehot']
+    return NUMERIC_FEATURES + list(onehot.get_feature_names_out(CATEGORICAL_FEATURES))
 
-def train_model(test_size=0.2, random_state=42):
-    global current_model
+def tune_hyperparameters(X_train, y_train, validation_size=0.2, random_state=42, preprocessing=DEFAULT_PREPROCESSING,
+                         **search_options):
+    """
+    Runs the successive-halving search on a held-out fold of the training split and persists the winner.
+    The preprocessor is fitted once on the search-train part and shared by every candidate.
+    """
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=validation_size, random_state=random_state, stratify=y_train
+    )
+    preprocessor = build_preprocessor(preprocessing)
+    X_fit_t = preprocessor.fit_transform(X_fit)
+    X_val_t = preprocessor.transform(X_val)
+    
+    result = tuning.successive_halving(X_fit_t, y_fit.to_numpy(), X_val_t, y_val.to_numpy(),
+                                       random_state=random_state, fit_params=categorical_fit_params(preprocessing),
+                                       **search_options)
+    best = {
+        "params": result["params"],
+        "n_estimators": result["n_estimators"],
+        "validation_capture_top10": result["capture"],
+        "validation_auc": result["auc"],
+        "candidates_evaluated": len(result["history"]),
+        "search_seconds": result["elapsed"],
+        "preprocessing": preprocessing,
+        "tuned_at": time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    model_store.save_best_params(best)
+    return best
+
+def top_feature_importance(clf, preprocessing, n=10):
+    # Extract Feature Importance
+    # Accessing the classifier step
+    model = clf.named_steps['classifier']
+    importances = model.feature_importances_
     
+    # Normalize importances so they sum to 1
+    if importances.sum() > 0:
+        importances = importances / importances.sum()
+    
+    # Accessing feature names from preprocessor (one-hot columns, or the raw categoricals in native mode)
+    feature_names = transformed_feature_names(clf.named_steps['preprocessor'], preprocessing)
+    
+    # Map importance
+    feature_importance_dict = dict(zip(feature_names, importances))
+    
+    # Sort top 10
+    return dict(sorted(feature_importance_dict.items(), key=lambda item: item[1], reverse=True)[:n])
+
+def _row_ids(df):
+    # Fall back to row position for exports without an ID column (assumes append-only files)
+    if ID_COLUMN in df.columns:
+        return df[ID_COLUMN].astype(str).to_numpy()
+    return np.arange(len(df)).astype(str)
+
+def train_model(test_size=0.2, random_state=42, tune=False, use_best_params=True, tuning_options=None,
+                preprocessing=DEFAULT_PREPROCESSING, publish=True):
+    """
+    Fits and publishes a new scoring pipeline.
+    tune=True searches LightGBM parameters first (see backend/tuning.py); otherwise the last persisted
+    search result is reused when use_best_params is set, falling back to LightGBM defaults.
+    publish=False only persists the new version (training jobs swap it in from the API process).
+    """
     df = load_data()
     
     # Apply Feature Engineering
-    df = engineer_features(df)
+    with metrics.timer('engineer_features'):
+        df = engineer_features(df)
     
     # Updated Base Features + Engineered Features
     base_features = ['Lead Origin', 'Lead Source', 'Total Time Spent on Website', 'Last Activity', 'Tags']
-    fe_features = ['Has_High_Intent_Tag', 'Activity_Score', 'Time_Activity_Interaction']
+    fe_features = ENGINEERED_FEATURES
     
     features = base_features + fe_features
     target = 'Converted'
@@ -69,104 +200,353 @@ def train_model(test_size=0.2, random_state=42):
     X = df[features]
     y = df[target]
     
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    
+    if tune:
+        best = tune_hyperparameters(X_train, y_train, random_state=random_state, preprocessing=preprocessing,
+                                    **(tuning_options or {}))
+    else:
+        best = model_store.load_best_params() if use_best_params else None
+    
+    if best is not None:
+        classifier = tuning.make_classifier(best["params"], best["n_estimators"], random_state=random_state)
+    else:
+        classifier = LGBMClassifier(random_state=random_state)
+    
     # Preprocessing Pipeline
-    numeric_features = ['Total Time Spent on Website'] + fe_features
-    categorical_features = ['Lead Origin', 'Lead Source', 'Last Activity', 'Tags']
+    clf = Pipeline(steps=[('preprocessor', build_preprocessor(preprocessing)),
+                          ('classifier', classifier)])
     
-    numeric_transformer = SimpleImputer(strategy='median')
+    clf.fit(X_train, y_train, **categorical_fit_params(preprocessing, step='classifier'))
     
-    categorical_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy='constant', fill_value='Unknown')),
-        ('onehot', OneHotEncoder(handle_unknown='ignore'))
-    ])
+    y_pred = clf.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
     
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', numeric_transformer, numeric_features),
-            ('cat', categorical_transformer, categorical_features)
-        ])
+    y_proba = clf.predict_proba(X_test)[:, 1]
+    auc = roc_auc_score(y_test, y_proba) if y_test.nunique() > 1 else None
     
-    clf = Pipeline(steps=[('preprocessor', preprocessor),
-                          ('classifier', LGBMClassifier(random_state=random_state))])
+    sorted_importance = top_feature_importance(clf, preprocessing)
     
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    metadata = {
+        "trained_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "accuracy": accuracy,
+        "feature_importance": sorted_importance,
+        "test_size": test_size,
+        "random_state": random_state,
+        "n_rows": int(len(df)),
+        "features": features,
+        "params": best["params"] if best is not None else None,
+        "n_estimators": int(classifier.n_estimators),
+        "tuned": bool(tune),
+        "preprocessing": preprocessing,
+        "training_mode": "full",
+        # Reference for the drift guard of later incremental updates
+        "baseline_auc": auc,
+        "incremental_updates": 0
+    }
     
-    clf.fit(X_train, y_train)
+    # Ranked once here and persisted, so serving processes activating this version need not re-score
+    ranking = _rank_lead_base(clf, metadata)
     
-    y_pred = clf.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
+    # Persist first, then hot-swap: in-flight scoring keeps using the old model until the assignment
+    with _swap_lock:
+        version = model_store.save_model(clf, metadata, seen_ids=_row_ids(df), arrays=ranking,
+                                         artifacts={SCORER_FILENAME: LeanScorer.compile(clf, preprocessing).dumps()})
+        metadata['version'] = version
+        if publish:
+            _publish(clf, metadata, ranking)
     
-    current_model = clf
+    return {
+        "accuracy": accuracy,
+        "feature_importance": sorted_importance,
+        "version": version,
+        "params": metadata["params"],
+        "tuning": best if tune else None,
+        "training_mode": "full"
+    }
+
+def incremental_train(rounds=INCREMENTAL_ROUNDS, full_retrain_every=FULL_RETRAIN_EVERY,
+                      drift_tolerance=DRIFT_TOLERANCE, random_state=42, publish=True):
+    """
+    Continues boosting the active model on rows it has not seen, instead of retraining from scratch.
+    The fitted preprocessor is kept as-is (new categories fall into its unknown handling) and
+    `rounds` trees are added to the existing booster using only the new rows.
     
-    # Extract Feature Importance
-    # Accessing the classifier step
-    model = clf.named_steps['classifier']
-    importances = model.feature_importances_
+    Falls back to a full train_model() when there is no incremental baseline, when the last full
+    retrain is `full_retrain_every` updates old, when the delta is large, or when the current model's
+    AUC on the new rows has drifted more than `drift_tolerance` below the last full retrain's holdout AUC.
+    Returns the train_model() result shape plus "training_mode" and "new_rows".
+    """
+    model, metadata = current_model, current_model_metadata
+    seen_ids = model_store.load_seen_ids(metadata['version']) if metadata and metadata.get('version') else None
     
-    # Normalize importances so they sum to 1
-    if importances.sum() > 0:
-        importances = importances / importances.sum()
+    def full_retrain(reason):
+        result = train_model(random_state=random_state,
+                             preprocessing=(metadata or {}).get('preprocessing', DEFAULT_PREPROCESSING),
+                             publish=publish)
+        return dict(result, full_retrain_reason=reason, new_rows=None)
     
-    # Accessing feature names from preprocessor
-    onehot_columns = clf.named_steps['preprocessor'].named_transformers_['cat'].named_steps['onehot'].get_feature_names_out(categorical_features)
-    feature_names = numeric_features + list(onehot_columns)
+    if model is None or seen_ids is None or metadata.get('baseline_auc') is None:
+        return full_retrain("no incremental baseline")
+    if metadata.get('incremental_updates', 0) >= full_retrain_every:
+        return full_retrain(f"{full_retrain_every} incremental updates since the last full retrain")
     
-    # Map importance
-    feature_importance_dict = dict(zip(feature_names, importances))
+    df = load_data()
+    ids = _row_ids(df)
+    is_new = ~np.isin(ids, seen_ids)
+    n_new = int(is_new.sum())
+    if n_new == 0:
+        return {
+            "accuracy": metadata['accuracy'],
+            "feature_importance": metadata['feature_importance'],
+            "version": metadata['version'],
+            "params": metadata.get('params'),
+            "tuning": None,
+            "training_mode": "none",
+            "new_rows": 0
+        }
+    if n_new > MAX_DELTA_FRACTION * len(seen_ids):
+        return full_retrain(f"{n_new} new rows is too large a delta")
     
-    # Sort top 10
-    sorted_importance = dict(sorted(feature_importance_dict.items(), key=lambda item: item[1], reverse=True)[:10])
+    features = metadata['features']
+    with metrics.timer('engineer_features'):
+        new_df = engineer_features(df.loc[is_new])
+    X_new, y_new = new_df[features], new_df['Converted']
+    
+    # Prequential check: score the new rows with the current model before it learns from them
+    proba_before = model.predict_proba(X_new)[:, 1]
+    accuracy = accuracy_score(y_new, (proba_before >= 0.5).astype(int))
+    delta_auc = roc_auc_score(y_new, proba_before) if y_new.nunique() > 1 else None
+    if delta_auc is not None and delta_auc < metadata['baseline_auc'] - drift_tolerance:
+        return full_retrain(f"drift: AUC on new rows {delta_auc:.3f} vs baseline {metadata['baseline_auc']:.3f}")
+    
+    preprocessing = metadata.get('preprocessing', 'onehot')
+    preprocessor = model.named_steps['preprocessor']
+    previous = model.named_steps['classifier']
+    params = metadata.get('params') or {}
+    classifier = (tuning.make_classifier(params, rounds, random_state=random_state) if params
+                  else LGBMClassifier(n_estimators=rounds, random_state=random_state))
+    classifier.fit(preprocessor.transform(X_new), y_new, init_model=previous.booster_,
+                   **categorical_fit_params(preprocessing))
+    
+    clf = Pipeline(steps=[('preprocessor', preprocessor), ('classifier', classifier)])
+    sorted_importance = top_feature_importance(clf, preprocessing)
+    
+    new_metadata = dict(
+        metadata,
+        trained_at=time.strftime('%Y-%m-%d %H:%M:%S'),
+        accuracy=accuracy,
+        feature_importance=sorted_importance,
+        n_rows=int(len(df)),
+        n_estimators=int(classifier.booster_.num_trees()),
+        training_mode="incremental",
+        parent_version=metadata['version'],
+        new_rows=n_new,
+        delta_auc_before_update=delta_auc,
+        incremental_updates=metadata.get('incremental_updates', 0) + 1
+    )
+    new_metadata.pop('version', None)
+    ranking = _rank_lead_base(clf, new_metadata)
+    
+    with _swap_lock:
+        version = model_store.save_model(clf, new_metadata, seen_ids=np.concatenate([seen_ids, ids[is_new]]),
+                                         arrays=ranking,
+                                         artifacts={SCORER_FILENAME: LeanScorer.compile(clf, preprocessing).dumps()})
+        new_metadata['version'] = version
+        if publish:
+            _publish(clf, new_metadata, ranking)
     
     return {
+        # Accuracy of the pre-update model on the new rows: the only unseen data in an incremental run
         "accuracy": accuracy,
-        "feature_importance": sorted_importance
+        "feature_importance": sorted_importance,
+        "version": version,
+        "params": new_metadata.get('params'),
+        "tuning": None,
+        "training_mode": "incremental",
+        "new_rows": n_new
     }
 
-def predict_lead_proba(lead_data: dict):
-    global current_model
-    if current_model is None:
-        # Auto-train if not exists
+def _set_current_model(model, metadata):
+    global current_model, current_model_metadata, current_scorer
+    try:
+        scorer = LeanScorer.compile(model, (metadata or {}).get('preprocessing', 'onehot'))
+    except Exception as e:
+        # Single-lead scoring falls back to the full pipeline
+        logger.warning("Could not compile the lean scorer, using the pipeline for single leads: %s", e)
+        scorer = None
+    current_scorer = scorer
+    current_model_metadata = metadata
+    current_model = model
+
+def _publish(model, metadata, ranking=None):
+    """
+    Makes a model live together with its ranking for /api/leads/top. Call with _swap_lock held.
+    The ranking is prepared first, so the swap itself is only a few reference assignments.
+    """
+    global current_score_index
+    index = _score_index_for(model, metadata, ranking)
+    _set_current_model(model, metadata)
+    current_score_index = index
+
+def activate_version(version):
+    """Loads a persisted version (e.g. one written by a training job process) and swaps it in."""
+    model, metadata = model_store.load_model(version)
+    if model is None:
+        raise ModelNotReadyError(f"Model version {version} not found")
+    with _swap_lock:
+        _publish(model, metadata)
+    return metadata
+
+def refresh_if_stale():
+    """
+    Swaps in the store's LATEST version if another process published a newer one.
+    Used by pre-forked workers (backend/serve.py), where a retrain in one worker must reach all of them.
+    Returns True when a new version was activated.
+    """
+    latest = model_store.latest_version()
+    active = (current_model_metadata or {}).get('version')
+    if latest is None or latest == active:
+        return False
+    activate_version(latest)
+    return True
+
+def get_model():
+    """Returns the active model, without ever training on the caller's thread."""
+    model = current_model
+    if model is None:
+        raise ModelNotReadyError("No trained model is loaded. Call /api/train first.")
+    return model
+
+def load_latest_model():
+    """Loads the latest persisted version into memory. Returns False when the store is empty."""
+    model, metadata = model_store.load_model()
+    if model is None:
+        return False
+    with _swap_lock:
+        _set_current_model(model, metadata)
+    return True
+
+def ensure_model_loaded():
+    """
+    Warm startup: load the latest persisted model, training once only if nothing has been saved yet.
+    Meant to run at process start, not on a request thread.
+    """
+    if current_model is None and not load_latest_model():
         train_model()
+    if current_score_index is None:
+        build_score_index()
+    return current_model_metadata
+
+def predict_lead_proba(lead_data: dict):
+    model = get_model()
+    
+    with metrics.timer('predict_proba_single'):
+        # Compiled path: lookup tables + one NumPy vector + booster raw predict
+        scorer = current_scorer
+        if scorer is not None:
+            return scorer.predict_proba(lead_data)
+        
+        # Apply FE for inference on the dict, then build the one-row frame the pipeline expects
+        df = pd.DataFrame([engineer_record(lead_data)])
         
-    df = pd.DataFrame([lead_data])
+        proba = model.predict_proba(df)[0][1] # Probability of Class 1 (Converted)
+    return proba
+
+def predict_lead_proba_batch(df, model=None):
+    """
+    Scores a whole DataFrame of leads in one pass.
+    Feature engineering and predict_proba run once over the frame instead of once per row.
+    Returns a numpy array of conversion probabilities aligned with df's rows.
+    """
+    model = model if model is not None else get_model()
     
-    # Apply FE for inference
-    df = engineer_features(df)
+    if len(df) == 0:
+        return np.empty(0, dtype=float)
     
-    proba = current_model.predict_proba(df)[0][1] # Probability of Class 1 (Converted)
-    return proba
+    # Only the columns the model consumes, so FE does not copy the whole lead table
+    with metrics.timer('engineer_features'):
+        X = engineer_features(df[MODEL_INPUT_COLUMNS])
+    
+    with metrics.timer('predict_proba'):
+        return model.predict_proba(X)[:, 1] # Probability of Class 1 (Converted)
 
-def get_leads_data():
-    """Returns a sample of leads with their actual data and prediction"""
-    global current_model
-    if current_model is None:
-        train_model()
-        
+def get_leads_data(limit=None):
+    """Returns the leads with their actual data and prediction, scored in a single batch"""
     df = load_data()
+    if limit is not None:
+        df = df.sample(min(limit, len(df)))
+    
+    # Score on the raw frame so missing values reach the model's imputers as NaN
+    probas = predict_lead_proba_batch(df)
+    
     # Fill NA for display
     df = df.fillna('')
+    df['ConvertedProbability'] = probas.astype(float)
     
-    # Select a subset to return to frontend
-    sample = df.sample(50).to_dict(orient='records')
-    
-    # Add predictions
-    results = []
-    for record in sample:
-        # We need to construct the input exactly as the model expects
-        input_data = {
-            'Lead Origin': record.get('Lead Origin'),
-            'Lead Source': record.get('Lead Source'),
-            'Total Time Spent on Website': record.get('Total Time Spent on Website') if record.get('Total Time Spent on Website') != '' else 0,
-            'Last Activity': record.get('Last Activity'),
-            'Tags': record.get('Tags')
-        }
-        
-        # Calculate proba
-        # Note: Input data for model needs to be a DataFrame
-        proba = predict_lead_proba(input_data)
-        
-        # Add to record
-        record['ConvertedProbability'] = float(proba)
-        results.append(record)
-        
-    return results
+    return df.to_dict(orient='records')
+
+def _rank_lead_base(model, metadata):
+    """
+    Scores the whole lead base under `model` and orders it, as arrays for model_store.save_model.
+    Records the dataset fingerprint in metadata: the arrays are only valid for that data.
+    """
+    metadata['ranked_dataset'] = dataset_fingerprint(DATA_PATH)
+    scores = predict_lead_proba_batch(load_data(), model=model).astype(float)
+    return {model_store.SCORES_FILENAME: scores, model_store.SCORE_ORDER_FILENAME: rank_order(scores)}
+
+def _persisted_ranking(metadata, fingerprint):
+    """The version's stored scores and order (memory-mapped), or None if missing or for other data."""
+    version = (metadata or {}).get('version')
+    if not version or metadata.get('ranked_dataset') != fingerprint:
+        return None
+    scores = model_store.load_array(version, model_store.SCORES_FILENAME)
+    order = model_store.load_array(version, model_store.SCORE_ORDER_FILENAME)
+    if scores is None or order is None:
+        return None
+    return {model_store.SCORES_FILENAME: scores, model_store.SCORE_ORDER_FILENAME: order}
+
+def _display_frame(fingerprint):
+    # The previous index's frame when it was built from the same data: a shallow copy, so pre-forked
+    # workers keep sharing its pages instead of each re-running fillna over the lead table
+    previous = current_score_index
+    if previous is not None and previous.dataset_fingerprint == fingerprint:
+        return previous.df.copy(deep=False)
+    return load_data().fillna('')
+
+def _score_index_for(model, metadata, ranking=None):
+    fingerprint = dataset_fingerprint(DATA_PATH)
+    if ranking is None:
+        ranking = _persisted_ranking(metadata, fingerprint)
+    if ranking is None:
+        # Versions saved without a ranking, or a dataset that changed since training
+        scores = predict_lead_proba_batch(load_data(), model=model).astype(float)
+        order = None
+    else:
+        scores = ranking[model_store.SCORES_FILENAME]
+        order = ranking[model_store.SCORE_ORDER_FILENAME]
+    
+    display_df = _display_frame(fingerprint)
+    display_df['ConvertedProbability'] = np.asarray(scores, dtype=float)
+    
+    return ScoreIndex(display_df, scores, model_version=(metadata or {}).get('version'), order=order,
+                      dataset_fingerprint=fingerprint)
+
+def build_score_index(model=None, metadata=None):
+    """
+    Scores the whole lead base once and publishes a ScoreIndex for top-K queries.
+    Pass model/metadata to index a specific model; defaults to the active one.
+    """
+    global current_score_index
+    if model is None:
+        model, metadata = get_model(), current_model_metadata
+    index = _score_index_for(model, metadata)
+    current_score_index = index
+    return index
+
+def get_top_leads(k=50, offset=0, origins=None, sources=None):
+    """Highest-probability leads from the precomputed index, optionally filtered by origin/source."""
+    index = current_score_index
+    if index is None:
+        index = build_score_index()
+    return index.page(k=k, offset=offset, origins=origins, sources=sources)
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import joblib
+import numpy as np
+
+# Versioned on-disk store for fitted scoring pipelines
+# Layout: <MODEL_STORE_DIR>/<version>/{model.joblib, metadata.json} plus a LATEST pointer file
+MODEL_STORE_DIR = os.environ.get(
+    'MODEL_STORE_DIR',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'artifacts', 'models'))
+)
+
+MODEL_FILENAME = 'model.joblib'
+METADATA_FILENAME = 'metadata.json'
+# IDs of the dataset rows a version has already accounted for (used by incremental retraining)
+SEEN_IDS_FILENAME = 'seen_ids.npy'
+# The version's scores over the whole lead base and their descending order (see ml_service._rank_lead_base)
+SCORES_FILENAME = 'scores.npy'
+SCORE_ORDER_FILENAME = 'score_order.npy'
+LATEST_POINTER = 'LATEST'
+
+def _new_version():
+    # Sortable, unique enough for one writer per millisecond
+    return time.strftime('%Y%m%d-%H%M%S') + f"-{int(time.time() * 1000) % 1000:03d}"
+
+def _atomic_write_text(path, text):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def save_model(model, metadata: dict, seen_ids=None, artifacts=None, arrays=None) -> str:
+    """
+    Persists a fitted pipeline and its metadata as a new version, then moves LATEST to it.
+    The version directory is written under a temp name and renamed, so readers never see a partial model.
+    `artifacts` maps extra file names to text written alongside (e.g. the compiled scorer),
+    `arrays` maps file names to numpy arrays (e.g. the lead-base scores), read back with load_array.
+    """
+    os.makedirs(MODEL_STORE_DIR, exist_ok=True)
+    version = _new_version()
+
+    tmp_dir = tempfile.mkdtemp(dir=MODEL_STORE_DIR, prefix='.tmp-')
+    try:
+        joblib.dump(model, os.path.join(tmp_dir, MODEL_FILENAME))
+        if seen_ids is not None:
+            np.save(os.path.join(tmp_dir, SEEN_IDS_FILENAME), np.asarray(seen_ids, dtype=str), allow_pickle=False)
+        for filename, array in (arrays or {}).items():
+            np.save(os.path.join(tmp_dir, filename), np.asarray(array), allow_pickle=False)
+        for filename, text in (artifacts or {}).items():
+            with open(os.path.join(tmp_dir, filename), 'w', encoding='utf-8') as f:
+                f.write(text)
+        metadata = dict(metadata, version=version)
+        with open(os.path.join(tmp_dir, METADATA_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2, default=float)
+        os.replace(tmp_dir, os.path.join(MODEL_STORE_DIR, version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _atomic_write_text(os.path.join(MODEL_STORE_DIR, LATEST_POINTER), version)
+    return version
+
+def list_versions():
+    if not os.path.isdir(MODEL_STORE_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(MODEL_STORE_DIR)
+        if not name.startswith('.') and os.path.isfile(os.path.join(MODEL_STORE_DIR, name, MODEL_FILENAME))
+    )
+
+def latest_version():
+    pointer = os.path.join(MODEL_STORE_DIR, LATEST_POINTER)
+    if os.path.exists(pointer):
+        with open(pointer, encoding='utf-8') as f:
+            version = f.read().strip()
+        if version:
+            return version
+    # Pointer missing (e.g. copied store): fall back to the newest complete version
+    versions = list_versions()
+    return versions[-1] if versions else None
+
+def load_metadata(version: str) -> dict:
+    with open(os.path.join(MODEL_STORE_DIR, version, METADATA_FILENAME), encoding='utf-8') as f:
+        return json.load(f)
+
+def artifact_path(version: str, filename: str):
+    return os.path.join(MODEL_STORE_DIR, version, filename)
+
+def load_seen_ids(version: str):
+    """Row IDs recorded with a version, or None for versions saved without them."""
+    path = os.path.join(MODEL_STORE_DIR, version, SEEN_IDS_FILENAME)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, allow_pickle=False)
+
+def load_array(version: str, filename: str):
+    """
+    A numpy array saved with a version, memory-mapped read-only so every process that loads it
+    shares the same pages. None for versions saved without it.
+    """
+    path = os.path.join(MODEL_STORE_DIR, version, filename)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode='r', allow_pickle=False)
+
+def load_model(version=None):
+    """
+    Loads (model, metadata) for a version, defaulting to the latest one.
+    Numpy buffers are memory-mapped read-only so processes loading the same version share pages.
+    Returns (None, None) when the store is empty.
+    """
+    version = version or latest_version()
+    if version is None:
+        return None, None
+    model = joblib.load(os.path.join(MODEL_STORE_DIR, version, MODEL_FILENAME), mmap_mode='r')
+    return model, load_metadata(version)
+
+BEST_PARAMS_FILENAME = 'best_params.json'
+
+def save_best_params(config: dict):
+    """Persists the winning tuning configuration; plain retrains reuse it instead of searching again."""
+    os.makedirs(MODEL_STORE_DIR, exist_ok=True)
+    _atomic_write_text(os.path.join(MODEL_STORE_DIR, BEST_PARAMS_FILENAME), json.dumps(config, indent=2, default=float))
+
+def load_best_params():
+    path = os.path.join(MODEL_STORE_DIR, BEST_PARAMS_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
@@ -1,14 +1,46 @@
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, List, Dict, Optional
 
 class TrainRequest(BaseModel):
     test_size: float = 0.2
     random_state: int = 42
+    # "onehot" or "native" (LightGBM categorical splits on ordinal codes); None = server default
+    preprocessing: Optional[str] = None
+    # Hyperparameter search (successive halving with early stopping); the winner is persisted
+    tune: bool = False
+    # Plain retrains reuse the last persisted search result unless this is False
+    use_best_params: bool = True
+    n_candidates: int = Field(27, ge=1)
+    min_rounds: int = Field(50, ge=1)
+    max_rounds: int = 800
+    # Keep 1/eta of the candidates per rung; eta < 2 would never narrow the field
+    eta: int = Field(3, ge=2)
+    early_stopping_rounds: int = 30
+    validation_size: float = 0.2
+    time_budget_seconds: Optional[float] = None
+    n_jobs: int = 4
+    # Continue boosting the current model on rows it has not seen; falls back to a full retrain on drift
+    incremental: bool = False
+    incremental_rounds: Optional[int] = None
+    full_retrain_every: Optional[int] = None
+    drift_tolerance: Optional[float] = None
+
+    @model_validator(mode='after')
+    def _check_rounds(self):
+        if self.max_rounds < self.min_rounds:
+            raise ValueError("max_rounds must be at least min_rounds")
+        return self
 
 class TrainResponse(BaseModel):
     accuracy: float
     feature_importance: Dict[str, float]
     message: str
+    version: Optional[str] = None
+    params: Optional[Dict[str, Any]] = None
+    tuning: Optional[Dict[str, Any]] = None
+    # "full", "incremental", or "none" when an incremental run found no new rows
+    training_mode: str = "full"
+    new_rows: Optional[int] = None
 
 class LeadProfile(BaseModel):
     LeadId: str
@@ -22,7 +54,41 @@ class LeadProfile(BaseModel):
 
 class EmailGenerationRequest(BaseModel):
     lead_profile: LeadProfile
+    # Set False to force a fresh generation instead of reusing a cached draft
+    use_cache: bool = True
 
 class EmailGenerationResponse(BaseModel):
     email_content: str
     product_recommended: str
+    # Model tier that wrote the draft, or "template" for the no-LLM fast path
+    generation_tier: Optional[str] = None
+
+class CampaignRequest(BaseModel):
+    # Either explicit lead IDs (Prospect ID) or a score threshold over the ranked lead base
+    lead_ids: Optional[List[str]] = None
+    min_score: Optional[float] = None
+    limit: Optional[int] = Field(None, ge=1)
+    workers: int = 4
+    use_cache: bool = True
+
+class CampaignStatus(BaseModel):
+    campaign_id: str
+    status: str
+    total: int
+    completed: int
+    failed: int
+    workers: int
+    created_at: float
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+class TrainJobStatus(BaseModel):
+    job_id: str
+    status: str
+    incremental: bool
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # train_model / incremental_train result once completed
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
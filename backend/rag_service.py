@@ -1,8 +1,17 @@
 import os
+import time
+import logging
+import asyncio
+import httpx
+from contextlib import asynccontextmanager
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.documents import Document
+from backend.email_cache import EmailCache, make_key
+from backend import catalog_index, metrics, usage
+
+logger = logging.getLogger(__name__)
 
 # Simulated Western Digital Catalog
 CATALOG_TEXT = """
@@ -22,18 +31,44 @@ CATALOG_TEXT = """
    - Key Features: Thunderbolt 3, USB-C, Enterprise-class Ultrastar drive inside.
 """
 
-def retrieve_product(lead_profile: dict) -> str:
-    """
-    Retrieves relevant product based on Lead Profile rules.
-    This simulates the 'Retrieval' step in RAG.
-    """
-    
+# Product retrieval: a Chroma vector index over the catalog (catalog_index.py).
+# If the index cannot be built (chromadb or the embedding model unavailable) the rule-based matcher is used.
+_catalog_index_failed = False
+_catalog_docs = None
+
+def _catalog_documents():
+    global _catalog_docs
+    if _catalog_docs is None:
+        _catalog_docs = {d.metadata['name']: d for d in catalog_index.load_catalog(CATALOG_TEXT)}
+    return _catalog_docs
+
+def _get_catalog_index():
+    global _catalog_index_failed
+    if _catalog_index_failed:
+        return None
+    try:
+        return catalog_index.get_index(CATALOG_TEXT)
+    except Exception as e:
+        _catalog_index_failed = True
+        logger.warning("Catalog vector index unavailable, falling back to rule-based retrieval: %s", e)
+        return None
+
+def warm_catalog_index():
+    """Builds (or loads) the catalog index up front so the first request does not pay for it."""
+    return _get_catalog_index() is not None
+
+def _lead_query(lead_profile: dict) -> str:
+    # Same signals the rules look at, as free text for the embedding model
+    parts = [lead_profile.get('Tags'), lead_profile.get('Lead Source'), lead_profile.get('Specialization')]
+    return " ".join(str(p) for p in parts if p and str(p).lower() not in ('nan', 'select', 'unknown')).strip()
+
+def _retrieve_product_by_rules(lead_profile: dict) -> str:
     # 1. Extract Signals
     tags = str(lead_profile.get('Tags', '')).lower()
     source = str(lead_profile.get('Lead Source', '')).lower()
     specialization = str(lead_profile.get('Specialization', '')).lower() # If available
     
-    # 2. Heuristic Matching (Simulating Vector Similarity)
+    # 2. Heuristic Matching
     if "games" in tags or "hardware" in specialization:
         return "WD_BLACK SN850X (NVMe SSD for Gaming)"
     elif "data" in tags or "business" in tags or "logic" in source: # 'logic' -> generic business
@@ -44,18 +79,36 @@ def retrieve_product(lead_profile: dict) -> str:
     # Default fallback
     return "Ultrastar DC HC550 (Standard B2B Offering)"
 
-def generate_email_content(lead_profile: dict, product_name: str, product_details: str):
+def retrieve_product(lead_profile: dict) -> str:
     """
-    Generates an email using Ollama (Mistral).
+    Retrieves relevant product for the Lead Profile by vector similarity over the catalog.
+    This is the 'Retrieval' step in RAG.
     """
-    # Initialize Ollama Chat Model
-    # Assumes Ollama is running locally on default port 11434
-    try:
-        llm = ChatOllama(model="mistral")
-    except Exception as e:
-        return f"Error initializing Ollama: {str(e)}. Ensure Ollama is installed and running."
-    
-    template = """
+    with metrics.timer('retrieve_product'):
+        query = _lead_query(lead_profile)
+        index = _get_catalog_index() if query else None
+        if index is None:
+            return _retrieve_product_by_rules(lead_profile)
+        
+        matches = index.search(query, k=1)
+        if not matches:
+            return _retrieve_product_by_rules(lead_profile)
+        return matches[0][0].metadata['label']
+
+# Generation settings. One client per model is shared by every request so HTTP connections to Ollama are pooled.
+LLM_MODEL = os.environ.get('OLLAMA_MODEL', 'mistral')
+# Upper bound on concurrent LLM calls per tier from this process; extra callers wait on the tier's semaphore
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '4'))
+# Callers allowed to wait for a slot per tier; beyond this, requests shed to the next cheaper tier
+LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', '32'))
+# Generation tiers, heaviest first: "model@min_score[/max_concurrency[/max_queue]]", comma-separated, e.g.
+#   LLM_TIERS="mistral@0.6,phi3:mini@0.25/8"
+# A lead goes to the first tier whose min_score its ConvertedProbability reaches and which has queue room.
+# Leads below every tier, and leads shed past the last one, get the template fast path (no LLM call).
+# The default is a single tier serving every lead, with the template only as the overload fallback.
+LLM_TIERS = os.environ.get('LLM_TIERS', f"{LLM_MODEL}@0")
+
+EMAIL_TEMPLATE = """
     You are a professional B2B Sales Representative for Western Digital.
     
     Goal: Write a personalized cold email to a prospective lead.
@@ -76,37 +129,423 @@ def generate_email_content(lead_profile: dict, product_name: str, product_detail
     
     Email Draft:
     """
+
+EMAIL_PROMPT = PromptTemplate.from_template(EMAIL_TEMPLATE)
+
+class GenerationError(RuntimeError):
+    """Raised by the async generation paths when the LLM call fails; the message says what to check."""
+    pass
+
+# Fast path: filled in directly, for cold leads and when every eligible tier is saturated
+FAST_PATH_EMAIL = """Subject: {product_short} for your team
+
+Hi there,
+
+Thank you for exploring Western Digital{visit_note}. We think {product_name} could be a strong fit for your team: {product_details}
+
+Would you be open to a 15-minute call this week to see whether it matches your needs?
+
+Best regards,
+Western Digital Sales Team"""
+
+_llm_waiting = metrics.gauge('llm_requests_waiting', 'Async generations queued for an LLM concurrency slot')
+_llm_active = metrics.gauge('llm_requests_active', 'Async generations holding an LLM concurrency slot')
+_routes = metrics.counter('generation_routes_total', 'Email generations by route (tier model or template) and reason')
+
+class GenerationTier:
+    """One local model with its own client, concurrency limit and bounded wait queue."""
+
+    def __init__(self, model, min_score=0.0, max_concurrency=LLM_MAX_CONCURRENCY, max_queue=LLM_MAX_QUEUE):
+        self.name = model
+        self.model = model
+        self.min_score = min_score
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._llm = None
+        self._chain = None
+        _llm_waiting.set(0, tier=self.name)
+        _llm_active.set(0, tier=self.name)
+
+    def get_llm(self):
+        if self._llm is None:
+            limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            # Token counts and timings of every call go to the usage ledger behind /api/roi
+            self._llm = ChatOllama(model=self.model, client_kwargs={"limits": limits},
+                                   callbacks=[usage.UsageCallback('email')])
+        return self._llm
+
+    def get_chain(self):
+        if self._chain is None:
+            self._chain = EMAIL_PROMPT | self.get_llm() | StrOutputParser()
+        return self._chain
+
+    def has_room(self):
+        # Free slot, or a place in the bounded queue behind the busy ones (max_queue=0: never wait)
+        return not self._semaphore.locked() or self.waiting < self.max_queue
+
+    @asynccontextmanager
+    async def slot(self):
+        # The semaphore plus queue-depth gauges and the time spent waiting for a slot
+        start = time.perf_counter()
+        self.waiting += 1
+        _llm_waiting.inc(tier=self.name)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+            _llm_waiting.dec(tier=self.name)
+        metrics.LLM_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start)
+        _llm_active.inc(tier=self.name)
+        try:
+            yield
+        finally:
+            _llm_active.dec(tier=self.name)
+            self._semaphore.release()
+
+class TemplateTier:
+    name = "template"
+    min_score = 0.0
+
+TEMPLATE_TIER = TemplateTier()
+
+def parse_tiers(spec: str):
+    """
+    GenerationTiers from an LLM_TIERS string: "model@min_score[/max_concurrency[/max_queue]]" entries.
+    '@' and '/' never appear in Ollama model names, so tags like qwen2:1.5b parse unambiguously.
+    Raises ValueError naming the offending entry.
+    """
+    tiers = []
+    for entry in filter(None, (e.strip() for e in spec.split(','))):
+        model, sep, limits = entry.rpartition('@')
+        fields = limits.split('/')
+        if not sep or not model or len(fields) > 3:
+            raise ValueError(f"LLM_TIERS entry {entry!r} must look like model@min_score[/max_concurrency[/max_queue]]")
+        try:
+            min_score = float(fields[0])
+            max_concurrency = int(fields[1]) if len(fields) > 1 else LLM_MAX_CONCURRENCY
+            max_queue = int(fields[2]) if len(fields) > 2 else LLM_MAX_QUEUE
+        except ValueError:
+            raise ValueError(f"LLM_TIERS entry {entry!r}: min_score must be a number, "
+                             f"max_concurrency and max_queue integers") from None
+        if not 0 <= min_score <= 1:
+            raise ValueError(f"LLM_TIERS entry {entry!r}: min_score must be between 0 and 1")
+        if max_concurrency < 1:
+            raise ValueError(f"LLM_TIERS entry {entry!r}: max_concurrency must be at least 1")
+        if max_queue < 0:
+            raise ValueError(f"LLM_TIERS entry {entry!r}: max_queue must not be negative")
+        tiers.append(GenerationTier(model, min_score, max_concurrency, max_queue))
+    if not tiers:
+        raise ValueError("LLM_TIERS must define at least one tier")
+    # Heaviest (highest threshold) first, whatever order they were listed in
+    return sorted(tiers, key=lambda t: t.min_score, reverse=True)
+
+TIERS = parse_tiers(LLM_TIERS)
+
+def _lead_score(lead_profile: dict):
+    try:
+        score = float(lead_profile.get('ConvertedProbability'))
+    except (TypeError, ValueError):
+        return None
+    return None if score != score else score # NaN
+
+def route_generation(lead_profile: dict, consider_load=True):
+    """
+    Picks the generation tier for a lead: the heaviest tier its score qualifies for, stepping down to
+    cheaper tiers while a tier's wait queue is full, and the template fast path after the last.
+    Leads without a score (e.g. offline evaluation) qualify for every tier.
+    """
+    score = _lead_score(lead_profile)
+    eligible = [t for t in TIERS if score is None or score >= t.min_score]
+    if not eligible:
+        _routes.inc(route=TEMPLATE_TIER.name, reason="score")
+        return TEMPLATE_TIER
+    for i, tier in enumerate(eligible):
+        if not consider_load or tier.has_room():
+            _routes.inc(route=tier.name, reason="score" if i == 0 else "load")
+            return tier
+    _routes.inc(route=TEMPLATE_TIER.name, reason="load")
+    return TEMPLATE_TIER
+
+def fill_template(lead_profile: dict, product_name: str, product_details: str) -> str:
+    try:
+        minutes = int(float(lead_profile.get('Total Time Spent on Website') or 0) // 60)
+    except (TypeError, ValueError):
+        minutes = 0
+    return FAST_PATH_EMAIL.format(
+        product_short=product_name.split(' (')[0],
+        visit_note=f" - we noticed you spent {minutes} minutes on our site" if minutes >= 1 else "",
+        product_name=product_name,
+        product_details=product_details
+    )
+
+# Generated emails keyed by rendered prompt + model parameters (see email_cache.py)
+email_cache = EmailCache()
+# Async generations currently running per cache key, so concurrent identical requests share one LLM call
+_inflight = {}
+
+_email_cache_lookups = metrics.counter('email_cache_lookups_total', 'Generated-email cache lookups by outcome')
+_email_cache_hit_ratio = metrics.gauge('email_cache_hit_ratio', 'Share of email cache lookups served from cache')
+_email_cache_entries = metrics.gauge('email_cache_memory_entries', 'Emails held in the in-memory cache layer')
+_inflight_gauge = metrics.gauge('llm_inflight_keys', 'Distinct prompts being generated (identical requests share one)')
+_query_cache_lookups = metrics.counter('catalog_query_cache_lookups_total',
+                                       'Catalog query-embedding cache lookups by outcome')
+
+@metrics.register_collector
+def _collect_metrics():
+    stats = email_cache.summary()
+    _email_cache_lookups.set_total(stats["memory_hits"], result="memory_hit")
+    _email_cache_lookups.set_total(stats["disk_hits"], result="disk_hit")
+    _email_cache_lookups.set_total(stats["misses"], result="miss")
+    _email_cache_hit_ratio.set(stats["hit_rate"])
+    _email_cache_entries.set(stats["memory_entries"])
+    _inflight_gauge.set(len(_inflight))
+    info = catalog_index.query_cache_info()
+    if info is not None:
+        _query_cache_lookups.set_total(info.hits, result="hit")
+        _query_cache_lookups.set_total(info.misses, result="miss")
+
+def get_llm():
+    """
+    Returns the shared ChatOllama client of the heaviest tier, creating it on first use.
+    Assumes Ollama is running locally on default port 11434
+    """
+    return TIERS[0].get_llm()
+
+def get_email_chain():
+    return TIERS[0].get_chain()
+
+# API LeadProfile field names -> the dataset column names used throughout this module
+_API_FIELDS = {
+    'Lead Origin': 'LeadOrigin',
+    'Lead Source': 'LeadSource',
+    'Total Time Spent on Website': 'TotalTimeSpentOnWebsite',
+    'Last Activity': 'LastActivity'
+}
+
+def normalise_profile(lead_profile: dict) -> dict:
+    """Accepts both the API's LeadProfile fields and dataset column names."""
+    profile = dict(lead_profile)
+    for column, field in _API_FIELDS.items():
+        if profile.get(column) is None and profile.get(field) is not None:
+            profile[column] = profile[field]
+    return profile
+
+def lead_profile_from_record(lead: dict) -> dict:
+    """
+    The profile the RAG pipeline reads, from a dataset row (campaigns, offline evaluation).
+    ConvertedProbability is only present on scored rows; without it the lead may use any tier.
+    """
+    return {
+        'Lead Source': lead.get('Lead Source'),
+        'Tags': lead.get('Tags'),
+        'Total Time Spent on Website': lead.get('Total Time Spent on Website', 0),
+        'Specialization': lead.get('Specialization', ''),
+        'ConvertedProbability': lead.get('ConvertedProbability')
+    }
+
+def _email_inputs(lead_profile: dict, product_name: str, product_details: str) -> dict:
+    return {
+        "time_on_site": lead_profile.get('Total Time Spent on Website', 0),
+        "source": lead_profile.get('Lead Source', 'Website'),
+        "tags": lead_profile.get('Tags', 'General Interest'),
+        "product_name": product_name,
+        "product_details": product_details
+    }
+
+def _cache_key(llm, inputs: dict) -> str:
+    # Everything that changes the completion: the exact prompt text and the sampling parameters
+    params = {name: getattr(llm, name, None) for name in
+              ("model", "temperature", "top_p", "top_k", "num_predict", "num_ctx", "seed", "stop")}
+    return make_key(EMAIL_PROMPT.format(**inputs), params)
+
+def _template_email(lead_profile: dict, product_name: str, product_details: str) -> str:
+    usage.record_email(cached=False, templated=True)
+    return fill_template(lead_profile, product_name, product_details)
+
+def generate_email_content(lead_profile: dict, product_name: str, product_details: str, use_cache=True, tier=None):
+    """
+    Generates an email using Ollama (Mistral). Blocking; used by the offline evaluation scripts.
+    Routed by score only (there is no async queue here). Successful drafts are cached unless
+    use_cache=False; errors never are.
+    """
+    tier = tier or route_generation(lead_profile, consider_load=False)
+    if tier is TEMPLATE_TIER:
+        return _template_email(lead_profile, product_name, product_details)
+    try:
+        chain = tier.get_chain()
+    except Exception as e:
+        return f"Error initializing Ollama: {str(e)}. Ensure Ollama is installed and running."
     
-    prompt = PromptTemplate.from_template(template)
-    chain = prompt | llm | StrOutputParser()
+    inputs = _email_inputs(lead_profile, product_name, product_details)
+    key = _cache_key(tier.get_llm(), inputs) if use_cache else None
+    if key is not None:
+        cached = email_cache.get(key)
+        if cached is not None:
+            usage.record_email(cached=True)
+            return cached
     
     try:
-        response = chain.invoke({
-            "time_on_site": lead_profile.get('Total Time Spent on Website', 0),
-            "source": lead_profile.get('Lead Source', 'Website'),
-            "tags": lead_profile.get('Tags', 'General Interest'),
-            "product_name": product_name,
-            "product_details": product_details
-        })
-        return response
+        # Streamed and joined, so time-to-first-token and token rate are measured
+        timings = metrics.StreamTimer()
+        chunks = []
+        for chunk in chain.stream(inputs):
+            if chunk:
+                timings.token()
+                chunks.append(chunk)
+        timings.finish()
+        email = "".join(chunks)
     except Exception as e:
-        return f"Error generation email: {str(e)}. Is the 'mistral' model pulled? Run 'ollama pull mistral'."
+        return f"Error generation email: {str(e)}. Is the '{tier.model}' model pulled? Run 'ollama pull {tier.model}'."
+    usage.record_email(cached=False)
+    if key is not None:
+        email_cache.put(key, email)
+    return email
+
+async def agenerate_email_content(lead_profile: dict, product_name: str, product_details: str, use_cache=True,
+                                  tier=None):
+    """
+    Async variant of generate_email_content for the API: awaits the LLM without holding a worker thread.
+    Routed by score and queue depth (see route_generation) unless a tier is given.
+    Raises GenerationError instead of returning error text, so callers can tell a failure from a draft.
+    """
+    tier = tier or route_generation(lead_profile)
+    if tier is TEMPLATE_TIER:
+        return _template_email(lead_profile, product_name, product_details)
+    try:
+        chain = tier.get_chain()
+    except Exception as e:
+        raise GenerationError(f"Error initializing Ollama: {str(e)}. Ensure Ollama is installed and running.") from e
+    
+    inputs = _email_inputs(lead_profile, product_name, product_details)
+    key = _cache_key(tier.get_llm(), inputs) if use_cache else None
+    if key is not None:
+        cached = await email_cache.aget(key)
+        if cached is not None:
+            usage.record_email(cached=True)
+            return cached
+        waiting = _inflight.get(key)
+        if waiting is not None:
+            # Raises the GenerationError of the call we joined if it failed
+            email = await asyncio.shield(waiting)
+            # None means the call we joined was cancelled; generate ourselves
+            if email is not None:
+                usage.record_email(cached=True)
+                return email
+    
+    pending = asyncio.get_running_loop().create_future()
+    if key is not None:
+        _inflight[key] = pending
+    try:
+        async with tier.slot():
+            timings = metrics.StreamTimer()
+            chunks = []
+            async for chunk in chain.astream(inputs):
+                if chunk:
+                    timings.token()
+                    chunks.append(chunk)
+            timings.finish()
+        email = "".join(chunks)
+        usage.record_email(cached=False)
+        if key is not None:
+            await email_cache.aput(key, email)
+    except asyncio.CancelledError:
+        pending.set_result(None)
+        raise
+    except Exception as e:
+        error = GenerationError(
+            f"Error generation email: {str(e)}. Is the '{tier.model}' model pulled? Run 'ollama pull {tier.model}'."
+        )
+        pending.set_exception(error)
+        # Marks the exception retrieved, so a failure nobody joined is not logged as unhandled
+        pending.exception()
+        raise error from e
+    finally:
+        if key is not None and _inflight.get(key) is pending:
+            del _inflight[key]
+    pending.set_result(email)
+    return email
+
+async def astream_email_content(lead_profile: dict, product_name: str, product_details: str, use_cache=True,
+                                tier=None):
+    """
+    Streams the email as the LLM produces it, yielding text chunks.
+    Holds a concurrency slot of its tier for the whole stream, like agenerate_email_content.
+    A cache hit or a template fill is yielded as a single chunk; a completed stream is cached.
+    """
+    tier = tier or route_generation(lead_profile)
+    if tier is TEMPLATE_TIER:
+        yield _template_email(lead_profile, product_name, product_details)
+        return
+    chain = tier.get_chain()
+    inputs = _email_inputs(lead_profile, product_name, product_details)
+    key = _cache_key(tier.get_llm(), inputs) if use_cache else None
+    if key is not None:
+        cached = await email_cache.aget(key)
+        if cached is not None:
+            usage.record_email(cached=True)
+            yield cached
+            return
+    
+    chunks = []
+    async with tier.slot():
+        timings = metrics.StreamTimer()
+        async for chunk in chain.astream(inputs):
+            if chunk:
+                timings.token()
+                chunks.append(chunk)
+                yield chunk
+        timings.finish()
+    usage.record_email(cached=False)
+    if key is not None:
+        await email_cache.aput(key, "".join(chunks))
 
 def get_product_details(product_name):
-    # Retrieve full details text from the catalog string
-    if "Ultrastar" in product_name:
-        return "18TB HDD for Data Centers/Hyperscale. High capacity, low TCO. Ideal for Cloud providers."
-    elif "WD_BLACK" in product_name:
-        return "NVMe SSD for Gaming/High-Performance. Blazing fast speeds. Ideal for Gamers and PC builders."
-    elif "SanDisk" in product_name:
-        return "External storage for Creative Professionals. Rugged, reliable. enterprise-class Ultrastar drive inside."
-    return "High quality storage solution from Western Digital."
-
-def run_rag_pipeline(lead_profile: dict):
+    # Retrieve full details for a product label ("Name (summary)") from the parsed catalog
+    doc = _catalog_documents().get(product_name.split(' (')[0].strip())
+    if doc is None:
+        return "High quality storage solution from Western Digital."
+    details = doc.metadata['description']
+    if doc.metadata['ideal_for']:
+        details += f" Ideal for {doc.metadata['ideal_for']}"
+    return details
+
+def run_rag_pipeline(lead_profile: dict, use_cache=True):
+    lead_profile = normalise_profile(lead_profile)
     product = retrieve_product(lead_profile)
     details = get_product_details(product)
-    email = generate_email_content(lead_profile, product, details)
+    tier = route_generation(lead_profile, consider_load=False)
+    email = generate_email_content(lead_profile, product, details, use_cache=use_cache, tier=tier)
     return {
         "recommended_product": product,
-        "email_draft": email
+        "email_draft": email,
+        "generation_tier": tier.name
     }
+
+async def arun_rag_pipeline(lead_profile: dict, use_cache=True):
+    lead_profile = normalise_profile(lead_profile)
+    # Query embedding and the Chroma lookup are blocking; keep them off the event loop
+    product = await asyncio.to_thread(retrieve_product, lead_profile)
+    details = get_product_details(product)
+    tier = route_generation(lead_profile)
+    email = await agenerate_email_content(lead_profile, product, details, use_cache=use_cache, tier=tier)
+    return {
+        "recommended_product": product,
+        "email_draft": email,
+        "generation_tier": tier.name
+    }
+
+async def astream_rag_pipeline(lead_profile: dict, use_cache=True):
+    """
+    Streaming RAG: yields ("product", name) once retrieval is done, ("tier", model or "template"),
+    then ("token", text) chunks.
+    """
+    lead_profile = normalise_profile(lead_profile)
+    product = await asyncio.to_thread(retrieve_product, lead_profile)
+    yield "product", product
+    details = get_product_details(product)
+    tier = route_generation(lead_profile)
+    yield "tier", tier.name
+    async for chunk in astream_email_content(lead_profile, product, details, use_cache=use_cache, tier=tier):
+        yield "token", chunk
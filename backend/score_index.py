@@ -0,0 +1,91 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+# Precomputed ranking of the scored lead base.
+# Segments (all leads, per Lead Origin, per Lead Source, per origin+source) each keep their row
+# positions sorted by descending ConvertedProbability, so a top-K page is just a slice.
+# Segments are cut from the global order, which training persists with each model version,
+# so a process activating a version never sorts scores itself.
+
+SEGMENT_COLUMNS = ('Lead Origin', 'Lead Source')
+
+def rank_order(scores):
+    """Row positions by descending score; the stable sort keeps ties in dataset order, so pages are deterministic."""
+    return np.argsort(-np.asarray(scores, dtype=float), kind='stable')
+
+class ScoreIndex:
+    def __init__(self, display_df, scores, model_version=None, order=None, dataset_fingerprint=None):
+        """
+        display_df: leads as returned to the frontend (NA already filled), positionally aligned with scores.
+        scores: ConvertedProbability per row (a read-only memmap is used as-is).
+        order: row positions by descending score, as rank_order(scores) returns; computed when omitted.
+        dataset_fingerprint: the data display_df was built from, so a later index can reuse the frame.
+        """
+        self.df = display_df.reset_index(drop=True)
+        self.scores = np.asarray(scores, dtype=float)
+        self.model_version = model_version
+        self.dataset_fingerprint = dataset_fingerprint
+
+        self._all = np.asarray(order) if order is not None else rank_order(self.scores)
+        self._by_origin = self._segment(['Lead Origin'])
+        self._by_source = self._segment(['Lead Source'])
+        self._by_pair = self._segment(list(SEGMENT_COLUMNS))
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _segment(self, columns):
+        if len(columns) == 1:
+            codes, values = pd.factorize(self.df[columns[0]])
+        else:
+            codes, values = pd.MultiIndex.from_frame(self.df[columns]).factorize()
+        # Filtering the global ranking by segment keeps each segment in score order (ties in dataset
+        # order, as with a per-segment stable sort), so grouping is one stable sort of integer codes
+        ranked_codes = codes[self._all]
+        kept = ranked_codes >= 0
+        ranked_codes = ranked_codes[kept]
+        positions = self._all[kept][np.argsort(ranked_codes, kind='stable')]
+        bounds = np.cumsum(np.bincount(ranked_codes, minlength=len(values)))[:-1]
+        return dict(zip(values, np.split(positions, bounds)))
+
+    def _candidates(self, origins, sources):
+        """Sorted position arrays whose union is exactly the requested filter."""
+        if origins and sources:
+            return [self._by_pair[(o, s)] for o in origins for s in sources if (o, s) in self._by_pair]
+        if origins:
+            return [self._by_origin[o] for o in origins if o in self._by_origin]
+        if sources:
+            return [self._by_source[s] for s in sources if s in self._by_source]
+        return [self._all]
+
+    def top(self, k=50, offset=0, origins=None, sources=None):
+        """
+        Returns (positions, total) for the page [offset, offset + k) of the filtered ranking.
+        A single segment is a slice; several segments (multi-value filters) are merged with a
+        heap over each segment's already-sorted head, touching at most offset + k rows per segment.
+        """
+        segments = self._candidates(origins, sources)
+        total = int(sum(len(s) for s in segments))
+        end = offset + k
+
+        if len(segments) == 1:
+            return segments[0][offset:end], total
+        if not segments or offset >= total:
+            return np.empty(0, dtype=np.int64), total
+
+        heads = [s[:end] for s in segments]
+        merged = heapq.merge(*[zip(-self.scores[h], h) for h in heads])
+        positions = [pos for _, pos in merged]
+        return np.asarray(positions[offset:end], dtype=np.int64), total
+
+    def page(self, k=50, offset=0, origins=None, sources=None):
+        positions, total = self.top(k=k, offset=offset, origins=origins, sources=sources)
+        leads = self.df.iloc[positions].to_dict(orient='records')
+        return {
+            "total": total,
+            "offset": offset,
+            "k": k,
+            "model_version": self.model_version,
+            "leads": leads
+        }
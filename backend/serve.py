@@ -0,0 +1,166 @@
+import os
+import gc
+import sys
+import time
+import signal
+import logging
+import socket
+import asyncio
+import argparse
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import uvicorn
+from backend import ml_service
+from backend.main import app
+
+logger = logging.getLogger(__name__)
+
+# Production serving mode: a pre-fork master with two separately sized worker pools.
+#
+#   scoring pool - CPU-bound routes (/api/leads, /api/leads/top, /api/model, /api/train/jobs): one process per
+#                  core, each with a small threadpool so sync endpoints do not oversubscribe the CPU
+#   llm pool     - LLM-bound routes (/api/generate-email*, /api/campaigns*): few processes, all concurrency
+#                  is async I/O waiting on Ollama (bounded per tier by rag_service.LLM_TIERS per process)
+#
+# The master loads the model and builds the score index once, then forks; workers share those pages
+# copy-on-write (the pipeline's arrays are also memory-mapped from the model store) and nobody trains at
+# startup. Each pool listens on its own port; put a path-routing proxy in front, e.g. nginx:
+#     location ~ ^/api/(generate-email|campaigns) { proxy_pass http://127.0.0.1:8001; proxy_buffering off; }
+#     location /                                  { proxy_pass http://127.0.0.1:8000; }
+# Both pools serve the full app, so either port still answers every route if hit directly.
+# /api/roi can go to either pool: token usage is flushed to a ledger shared by all workers (backend/usage.py).
+# Workers poll the model store and swap in versions published by a retrain in any other worker.
+# Training persists each version's lead-base scores and ranking order; workers memory-map them on a swap
+# instead of re-scoring the lead table, so those pages stay shared after a retrain too.
+# Metrics are per process and a shared port reaches an arbitrary worker, so with --metrics-port each worker
+# slot also listens on its own port (metrics_port + slot) for Prometheus to scrape /metrics from.
+
+MODEL_REFRESH_SECONDS = float(os.environ.get('MODEL_REFRESH_SECONDS', '5'))
+
+POOLS = ('scoring', 'llm')
+
+def _bind(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+async def _refresh_model_loop():
+    while True:
+        await asyncio.sleep(MODEL_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(ml_service.refresh_if_stale)
+        except Exception as e:
+            logger.exception("[serve %d] model refresh failed: %s", os.getpid(), e)
+
+async def _serve(socks, threads):
+    import anyio.to_thread
+    if threads:
+        # Threadpool used for sync (def) endpoints; sized to the CPU share of this worker
+        anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+    refresher = asyncio.get_running_loop().create_task(_refresh_model_loop())
+    config = uvicorn.Config(app, log_level=os.environ.get('LOG_LEVEL', 'info'), timeout_keep_alive=30)
+    try:
+        await uvicorn.Server(config).serve(sockets=socks)
+    finally:
+        refresher.cancel()
+
+def _run_worker(pool, socks, threads):
+    # Child process: restore default signal handling, uvicorn installs its own for graceful shutdown
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    ports = ", ".join(str(sock.getsockname()[1]) for sock in socks)
+    print(f"[serve {os.getpid()}] {pool} worker listening on port {ports}")
+    try:
+        asyncio.run(_serve(socks, threads))
+    finally:
+        os._exit(0)
+
+def serve(host='0.0.0.0', scoring_port=8000, llm_port=8001, scoring_workers=None, llm_workers=1, scoring_threads=2,
+          metrics_port=None):
+    if not hasattr(os, 'fork'):
+        # Windows has no fork: one process serving everything
+        print("Pre-fork serving needs os.fork; falling back to a single uvicorn process.")
+        uvicorn.run(app, host=host, port=scoring_port)
+        return
+
+    scoring_workers = scoring_workers or os.cpu_count() or 1
+
+    # Load once in the master: workers inherit the model and score index instead of each training or loading
+    ml_service.ensure_model_loaded()
+    # Keep the cyclic GC from touching (and so copying) every inherited object page in the children
+    gc.collect()
+    gc.freeze()
+
+    sockets = {'scoring': _bind(host, scoring_port)}
+    sizes = {'scoring': (scoring_workers, scoring_threads)}
+    if llm_workers > 0:
+        sockets['llm'] = _bind(host, llm_port)
+        # LLM routes are async; the threadpool default (40) is fine for the few sync ones
+        sizes['llm'] = (llm_workers, None)
+
+    # Worker slots, numbered across both pools; a restarted worker takes over its predecessor's slot
+    slots = [pool for pool, (count, _) in sizes.items() for _ in range(count)]
+    metrics_sockets = [_bind(host, metrics_port + slot) for slot in range(len(slots))] if metrics_port else None
+
+    children = {} # pid -> slot
+    stopping = False
+
+    def spawn(slot):
+        pool = slots[slot]
+        socks = [sockets[pool]] + ([metrics_sockets[slot]] if metrics_sockets else [])
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(pool, socks, sizes[pool][1])
+        children[pid] = slot
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(len(slots)):
+        spawn(slot)
+    print(f"[serve {os.getpid()}] master: {scoring_workers} scoring workers on :{scoring_port}"
+          + (f", {llm_workers} llm workers on :{llm_port}" if llm_workers > 0 else "")
+          + (f", metrics on :{metrics_port}-{metrics_port + len(slots) - 1}" if metrics_port else ""))
+
+    # Supervise: replace workers that die, until asked to stop
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is not None and not stopping:
+            print(f"[serve {os.getpid()}] {slots[slot]} worker {pid} exited ({status}), restarting")
+            time.sleep(0.5)
+            spawn(slot)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-fork production server with separate scoring and LLM pools")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--scoring-port', type=int, default=8000)
+    parser.add_argument('--llm-port', type=int, default=8001)
+    parser.add_argument('--scoring-workers', type=int, default=None, help="Default: one per CPU core")
+    parser.add_argument('--scoring-threads', type=int, default=2, help="Threadpool size per scoring worker")
+    parser.add_argument('--llm-workers', type=int, default=1, help="0 serves every route from the scoring pool")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="First per-worker port for scraping /metrics (one port per worker)")
+    args = parser.parse_args()
+    serve(host=args.host, scoring_port=args.scoring_port, llm_port=args.llm_port,
+          scoring_workers=args.scoring_workers, llm_workers=args.llm_workers, scoring_threads=args.scoring_threads,
+          metrics_port=args.metrics_port)
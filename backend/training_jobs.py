@@ -0,0 +1,130 @@
+import time
+import uuid
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import backend.ml_service as ml_service
+from backend import metrics
+
+# Background training: a job fits a model in a separate process, so a multi-minute retrain never holds
+# an API worker or competes with scoring for the GIL. The child only persists the new version to the
+# model store; the API process then loads it and swaps it in atomically (model + score index together).
+
+# Finished jobs kept in memory for polling; the oldest are dropped beyond this
+MAX_RETAINED_JOBS = 50
+
+class TrainingJobNotFoundError(KeyError):
+    pass
+
+class TrainingJob:
+    def __init__(self, incremental, train_kwargs):
+        self.id = uuid.uuid4().hex
+        self.incremental = incremental
+        self.train_kwargs = train_kwargs
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._task = None
+
+    @property
+    def done(self):
+        return self.status in ("completed", "failed")
+
+    def summary(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "incremental": self.incremental,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error
+        }
+
+_jobs = {}
+_executor = None
+# One fit at a time: jobs queue behind each other instead of fighting for the same cores
+_run_lock = None
+
+_jobs_gauge = metrics.gauge('training_jobs', 'Retained training jobs by status')
+
+@metrics.register_collector
+def _collect_metrics():
+    counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+    for job in list(_jobs.values()):
+        counts[job.status] = counts.get(job.status, 0) + 1
+    for status, count in counts.items():
+        _jobs_gauge.set(count, status=status)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn, not fork: the API process has live threads (threadpool, LLM clients) that fork would copy mid-state
+        _executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+def _train_in_subprocess(incremental, train_kwargs):
+    # Runs in the worker process; publish=False so nothing is scored or swapped there
+    if incremental:
+        ml_service.load_latest_model()
+        return ml_service.incremental_train(publish=False, **train_kwargs)
+    return ml_service.train_model(publish=False, **train_kwargs)
+
+async def _run(job: TrainingJob):
+    global _executor, _run_lock
+    if _run_lock is None:
+        _run_lock = asyncio.Lock()
+    async with _run_lock:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(_get_executor(), _train_in_subprocess, job.incremental, job.train_kwargs)
+            active = (ml_service.current_model_metadata or {}).get('version')
+            if result['version'] != active:
+                await asyncio.to_thread(ml_service.activate_version, result['version'])
+            job.result = result
+            job.status = "completed"
+        except BrokenProcessPool as e:
+            # The worker died (e.g. OOM-killed); start a fresh one for the next job
+            _executor = None
+            job.error = f"Training process died: {e}"
+            job.status = "failed"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+def _evict_finished():
+    finished = [j for j in _jobs.values() if j.done]
+    for job in sorted(finished, key=lambda j: j.created_at)[:max(0, len(_jobs) - MAX_RETAINED_JOBS)]:
+        _jobs.pop(job.id, None)
+
+def start_job(incremental=False, train_kwargs=None) -> TrainingJob:
+    """Enqueues a training job on the running event loop and returns immediately."""
+    _evict_finished()
+    job = TrainingJob(incremental, train_kwargs or {})
+    _jobs[job.id] = job
+    job._task = asyncio.get_running_loop().create_task(_run(job))
+    return job
+
+def get_job(job_id: str) -> TrainingJob:
+    try:
+        return _jobs[job_id]
+    except KeyError:
+        raise TrainingJobNotFoundError(job_id)
+
+def list_jobs():
+    return sorted(_jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
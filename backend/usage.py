@@ -0,0 +1,315 @@
+import os
+import time
+import logging
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+# Measured LLM usage: prompt/completion tokens and wall-clock time of every call, from Ollama's response
+# metadata (prompt_eval_count, eval_count, total_duration). A LangChain callback on each ChatOllama
+# client records into per-minute buckets kept in a fixed ring, so window queries are one vectorised
+# sum and memory stays constant. /api/roi prices these numbers instead of assumed token counts.
+# The API also flushes its buckets every few seconds into a SQLite ledger shared by all its processes
+# (attach_shared_store), so under backend/serve.py /api/roi sums every worker, whichever one answers.
+# Scripts that do not attach it (e.g. the offline evaluations) keep an in-process ledger only.
+
+BUCKET_SECONDS = 60
+# 7 days of minute buckets
+RETENTION_BUCKETS = int(os.environ.get('USAGE_RETENTION_MINUTES', str(7 * 24 * 60)))
+
+# Columns of a bucket
+FIELDS = ('calls', 'prompt_tokens', 'completion_tokens', 'wall_seconds', 'llm_seconds', 'estimated_calls',
+          'emails', 'cache_hits', 'templated')
+_COL = {name: i for i, name in enumerate(FIELDS)}
+
+# Used when a backend returns no token counts (the call is still counted, flagged as estimated)
+CHARS_PER_TOKEN = 4
+
+# Shared ledger for the API's processes; empty string keeps usage in-process only
+USAGE_DB = os.environ.get(
+    'USAGE_DB',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'artifacts', 'usage.sqlite3'))
+)
+FLUSH_SECONDS = float(os.environ.get('USAGE_FLUSH_SECONDS', '5'))
+
+class SharedUsageStore:
+    """Minute buckets per purpose in SQLite; every process adds its deltas, queries sum over all of them."""
+
+    def __init__(self, path, retention_buckets=RETENTION_BUCKETS):
+        self.path = path
+        self.retention = retention_buckets
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # Lazily opened, like the email cache, so importing never touches the filesystem
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            columns = ", ".join(f"{name} REAL NOT NULL DEFAULT 0" for name in FIELDS)
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS usage (purpose TEXT NOT NULL, bucket INTEGER NOT NULL, "
+                             f"{columns}, PRIMARY KEY (purpose, bucket))")
+            # Ledgers created before a field was added get the column
+            existing = {row[1] for row in self._db.execute("PRAGMA table_info(usage)")}
+            for name in FIELDS:
+                if name not in existing:
+                    self._db.execute(f"ALTER TABLE usage ADD COLUMN {name} REAL NOT NULL DEFAULT 0")
+        return self._db
+
+    def add(self, deltas):
+        """deltas: {(purpose, bucket): values aligned with FIELDS}."""
+        names = ", ".join(FIELDS)
+        placeholders = ", ".join("?" for _ in FIELDS)
+        updates = ", ".join(f"{name} = {name} + excluded.{name}" for name in FIELDS)
+        rows = [(purpose, bucket, *values.tolist()) for (purpose, bucket), values in deltas.items()]
+        newest = max(bucket for _, bucket in deltas)
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(f"INSERT INTO usage (purpose, bucket, {names}) VALUES (?, ?, {placeholders}) "
+                               f"ON CONFLICT (purpose, bucket) DO UPDATE SET {updates}", rows)
+                db.execute("DELETE FROM usage WHERE bucket <= ?", (newest - self.retention,))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+    def window(self, purpose, oldest=None, current=None):
+        sums = ", ".join(f"COALESCE(SUM({name}), 0)" for name in FIELDS)
+        query, params = f"SELECT {sums} FROM usage WHERE purpose = ?", [purpose]
+        if oldest is not None:
+            query += " AND bucket BETWEEN ? AND ?"
+            params += [oldest, current]
+        with self._lock:
+            row = self._connection().execute(query, params).fetchone()
+        return dict(zip(FIELDS, (float(v) for v in row)))
+
+    def first_bucket(self):
+        with self._lock:
+            row = self._connection().execute("SELECT MIN(bucket) FROM usage").fetchone()
+        return row[0]
+
+class UsageLedger:
+    """Time-bucketed counters per purpose ("email", "jury", ...) over a ring of RETENTION_BUCKETS minutes."""
+
+    def __init__(self, retention_buckets=RETENTION_BUCKETS, bucket_seconds=BUCKET_SECONDS):
+        self.retention = retention_buckets
+        self.bucket_seconds = bucket_seconds
+        self._rings = {} # purpose -> (bucket ids, values)
+        self._totals = {} # purpose -> lifetime values
+        self._lock = threading.Lock()
+        # With a shared store attached: deltas not yet flushed to it, (purpose, bucket) -> values
+        self.store = None
+        self._pending = {}
+
+    def _ring(self, purpose):
+        ring = self._rings.get(purpose)
+        if ring is None:
+            ring = self._rings[purpose] = (np.full(self.retention, -1, dtype=np.int64),
+                                           np.zeros((self.retention, len(FIELDS))))
+            self._totals[purpose] = np.zeros(len(FIELDS))
+        return ring
+
+    def add(self, purpose, now=None, **values):
+        bucket = int((time.time() if now is None else now) // self.bucket_seconds)
+        slot = bucket % self.retention
+        with self._lock:
+            ids, data = self._ring(purpose)
+            if ids[slot] != bucket:
+                # Slot last held a bucket one full ring ago: recycle it
+                ids[slot] = bucket
+                data[slot] = 0.0
+            pending = None
+            if self.store is not None:
+                pending = self._pending.get((purpose, bucket))
+                if pending is None:
+                    pending = self._pending[(purpose, bucket)] = np.zeros(len(FIELDS))
+            for name, value in values.items():
+                data[slot, _COL[name]] += value
+                self._totals[purpose][_COL[name]] += value
+                if pending is not None:
+                    pending[_COL[name]] += value
+
+    def flush(self):
+        """Writes unflushed deltas to the shared store (a no-op without one)."""
+        with self._lock:
+            deltas, self._pending = self._pending, {}
+        if self.store is not None and deltas:
+            try:
+                self.store.add(deltas)
+            except Exception:
+                # Put them back for the next flush rather than losing them
+                with self._lock:
+                    for key, values in deltas.items():
+                        self._pending[key] = self._pending.get(key, 0) + values
+                raise
+
+    def window(self, purpose, seconds=None, now=None):
+        """
+        Summed fields for `purpose` over the last `seconds`. With a shared store, across every process
+        attached to it (None = everything retained); otherwise this process only (None = since start).
+        """
+        if self.store is not None:
+            self.flush()
+            if seconds is None:
+                return self.store.window(purpose)
+            current = int((time.time() if now is None else now) // self.bucket_seconds)
+            return self.store.window(purpose, current - max(1, int(np.ceil(seconds / self.bucket_seconds))) + 1,
+                                     current)
+        with self._lock:
+            if purpose not in self._rings:
+                return dict.fromkeys(FIELDS, 0.0)
+            if seconds is None:
+                values = self._totals[purpose].copy()
+            else:
+                ids, data = self._rings[purpose]
+                current = int((time.time() if now is None else now) // self.bucket_seconds)
+                oldest = current - max(1, int(np.ceil(seconds / self.bucket_seconds))) + 1
+                values = data[(ids >= oldest) & (ids <= current)].sum(axis=0)
+        return dict(zip(FIELDS, values.tolist()))
+
+    def purposes(self):
+        with self._lock:
+            return list(self._rings)
+
+ledger = UsageLedger()
+
+_flusher = None
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            ledger.flush()
+        except Exception as e:
+            logger.warning("Usage ledger flush failed, retrying: %s", e)
+
+def attach_shared_store(path=USAGE_DB):
+    """
+    Sums this process's usage with every other process using the same ledger file, flushing from a
+    background thread. Call once per serving process, after any fork. Returns False when disabled.
+    """
+    global _flusher
+    if not path:
+        return False
+    if ledger.store is None:
+        ledger.store = SharedUsageStore(path, ledger.retention)
+    if _flusher is None:
+        _flusher = threading.Thread(target=_flush_loop, name='usage-flush', daemon=True)
+        _flusher.start()
+    return True
+
+_tokens = metrics.counter('llm_tokens_total', 'LLM tokens by purpose and kind (prompt/completion)')
+_calls = metrics.counter('llm_calls_total', 'LLM calls by purpose')
+
+def _estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+class UsageCallback(BaseCallbackHandler):
+    """
+    Records every call of the chat model it is attached to under `purpose`.
+    Token counts come from Ollama's prompt_eval_count / eval_count (usage_metadata on other backends);
+    wall time is measured here, from the request to the final chunk.
+    """
+    # Cheap and thread-safe, so no executor hop for async runs
+    run_inline = True
+
+    def __init__(self, purpose, ledger=ledger):
+        self.purpose = purpose
+        self.ledger = ledger
+        self._started = {} # run_id -> (start time, prompt chars)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        chars = sum(len(str(m.content)) for batch in messages for m in batch)
+        self._started[run_id] = (time.perf_counter(), chars)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start, prompt_chars = self._started.pop(run_id, (None, 0))
+        wall = time.perf_counter() - start if start is not None else 0.0
+        for generations in response.generations:
+            for generation in generations:
+                self._record(generation, wall, prompt_chars)
+
+    def _record(self, generation, wall, prompt_chars):
+        message = getattr(generation, 'message', None)
+        meta = getattr(message, 'response_metadata', None) or generation.generation_info or {}
+        usage = getattr(message, 'usage_metadata', None) or {}
+        prompt = meta.get('prompt_eval_count', usage.get('input_tokens'))
+        completion = meta.get('eval_count', usage.get('output_tokens'))
+        estimated = prompt is None or completion is None
+        if prompt is None:
+            prompt = prompt_chars // CHARS_PER_TOKEN
+        if completion is None:
+            completion = _estimate_tokens(generation.text)
+        # total_duration is Ollama's own time for the call (ns), excluding queueing on our side
+        llm_seconds = meta['total_duration'] / 1e9 if meta.get('total_duration') else wall
+
+        self.ledger.add(self.purpose, calls=1, prompt_tokens=prompt, completion_tokens=completion,
+                        wall_seconds=wall, llm_seconds=llm_seconds, estimated_calls=int(estimated))
+        _calls.inc(purpose=self.purpose)
+        _tokens.inc(prompt, purpose=self.purpose, kind='prompt')
+        _tokens.inc(completion, purpose=self.purpose, kind='completion')
+
+def record_email(cached: bool, purpose='email', templated=False):
+    """
+    Counts one email delivered to a caller, so cost per email includes drafts served from cache
+    and template fills (no LLM call) from the generation router.
+    """
+    ledger.add(purpose, emails=1, cache_hits=int(cached), templated=int(templated))
+
+# Token prices for costing measured usage ($ per 1k tokens)
+PRICE_PER_1K_PROMPT = float(os.environ.get('LLM_PRICE_PER_1K_PROMPT', '0.002'))
+PRICE_PER_1K_COMPLETION = float(os.environ.get('LLM_PRICE_PER_1K_COMPLETION', '0.002'))
+
+# Selectable /api/roi windows -> seconds (None = since process start)
+WINDOWS = {'5m': 300, '1h': 3600, '24h': 86400, '7d': 7 * 86400, 'all': None}
+
+_started_at = time.time()
+
+def _recording_since():
+    # Start of the data the summary covers: the oldest shared bucket, or this process's start
+    if ledger.store is not None:
+        first = ledger.store.first_bucket()
+        if first is not None:
+            return min(_started_at, first * ledger.bucket_seconds)
+    return _started_at
+
+def token_cost(prompt_tokens, completion_tokens):
+    return prompt_tokens / 1000 * PRICE_PER_1K_PROMPT + completion_tokens / 1000 * PRICE_PER_1K_COMPLETION
+
+def summary(purpose, window='1h'):
+    """Measured usage, cost and throughput for one purpose over a named window."""
+    seconds = WINDOWS[window]
+    values = ledger.window(purpose, seconds)
+    # Throughput over the part of the window usage has been recorded for
+    recorded = time.time() - _recording_since()
+    span = min(seconds, recorded) if seconds is not None else recorded
+    calls = values['calls']
+    cost = token_cost(values['prompt_tokens'], values['completion_tokens'])
+    return {
+        "window": window,
+        "calls": int(calls),
+        "estimated_calls": int(values['estimated_calls']),
+        "emails": int(values['emails']),
+        "cache_hits": int(values['cache_hits']),
+        "templated": int(values['templated']),
+        "prompt_tokens": int(values['prompt_tokens']),
+        "completion_tokens": int(values['completion_tokens']),
+        "avg_prompt_tokens": values['prompt_tokens'] / calls if calls else None,
+        "avg_completion_tokens": values['completion_tokens'] / calls if calls else None,
+        "avg_call_seconds": values['wall_seconds'] / calls if calls else None,
+        "completion_tokens_per_second": (values['completion_tokens'] / values['llm_seconds']
+                                         if values['llm_seconds'] else None),
+        "calls_per_hour": calls / span * 3600 if span > 0 else None,
+        "emails_per_hour": values['emails'] / span * 3600 if span > 0 else None,
+        "token_cost": cost
+    }